@@ -1,32 +1,288 @@
+import asyncio
 import logging
+import math
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
+from telegram.ext import (Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler,
+                          ConversationHandler, BaseUpdateProcessor)
 from telegram.constants import ParseMode
+from telegram.error import Forbidden, RetryAfter, TelegramError
 import sqlite3
-import datetime
-import hashlib
-import requests
-from typing import Dict, List, Optional
-import json
+import aiosqlite
+from aiosqlitepool import SQLiteConnectionPool
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from functools import wraps
+import time
+import httpx
 import os
 from dotenv import load_dotenv
 import re
+import html
+import json
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
-BOT_TOKEN = os.getenv('BOT_TOKEN')
-ADMIN_IDS = [int(id) for id in os.getenv('8405687963', '').split(',')]  # Multiple admin support
+@dataclass(frozen=True, slots=True)
+class Cfg:
+    """Settings read from the environment once at import"""
+    bot_token: str
+    admin_ids: frozenset[int]  # Multiple admin support
+    min_upi: int  # Rs
+    min_gw: int  # Rs
+    support: str  # Support username
+    webhook_url: str | None  # Public HTTPS base URL; polling if unset
+    webhook_port: int
+
+CFG = Cfg(
+    bot_token=os.environ['BOT_TOKEN'],
+    admin_ids=frozenset(int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x.strip()),
+    min_upi=int(os.getenv('MIN_WITHDRAWAL_UPI', 10)),
+    min_gw=int(os.getenv('MIN_WITHDRAWAL_GATEWAY', 1)),
+    support=os.getenv('SUPPORT_CONTACT', "@NAALLAGAMER"),
+    webhook_url=os.getenv('WEBHOOK_URL', os.getenv('RENDER_EXTERNAL_URL')),
+    webhook_port=int(os.getenv('PORT', 8443)),
+)
 SECRET_ADMIN_COMMAND = '/NAALLAGAMER'  # Secret admin panel command
 REQUIRED_CHANNELS = []  # Will be loaded from database
-MIN_WITHDRAWAL_UPI = 10  # Rs
-MIN_WITHDRAWAL_GATEWAY = 1  # Rs
-SUPPORT_CONTACT = "@NAALLAGAMER"  # Support username
+DB_PATH = 'task_bot.db'
+POOL = None  # SQLiteConnectionPool, opened in post_init
+POOL_SIZE = 10  # Max pooled read connections; each keeps its own page and statement cache
+POOL_MIN = 2  # Connections opened up front so the first updates don't pay for connect_db
+WRITER = None  # The one aiosqlite connection used for writes, opened in post_init; POOL serves reads
+WRITE_LOCK = asyncio.Lock()  # WAL allows one writer at a time; see write_db()
+HTTP = None  # Shared httpx.AsyncClient for outbound HTTP (IP checks, payment gateways), opened in post_init
+NOTIFY_Q = asyncio.Queue()  # (admin_id, text, photo) jobs drained by _notify_worker
+NOTIFY_WORKERS = 4  # Concurrent admin senders; keeps fan-out under Telegram's 30 msg/s limit
+BROADCAST_CONCURRENCY = 25  # Parallel sends per broadcast
+BROADCAST_CHUNK = 1000  # Recipients loaded per query
+WITHDRAWALS_PAGE = 10  # Pending withdrawals per admin screen
+USERS_PAGE = 20  # Users per admin list screen
+TX_Q = asyncio.Queue()  # transactions rows waiting for _tx_flusher
+TX_BATCH = 200  # Max rows written per commit
+TX_FLUSH_INTERVAL = 0.1  # Seconds between flushes, so bursts share one commit
+TX_RETRY_MAX = 30  # Cap on the back-off between retries of a failed flush
+TX_SHUTDOWN_TIMEOUT = 30  # How long shutdown waits for queued rows to be written
+CALLBACK_TASKS = set()  # Read-only callback screens running detached from their update
+MAX_CALLBACK_TASKS = 100  # Past this, callback screens are awaited in their update instead
+WORKER_TASKS = []  # Background tasks, started in post_init and cancelled in post_shutdown
+
+# In-process caches
+MEMBERSHIP_TTL = 60  # Seconds a channel-membership result stays valid
+MEMBERSHIP_CACHE = {}  # user_id -> (checked_at, is_member, not_joined)
+REQUIRED_CHANNELS_CACHE = None  # [(channel_id, channel_name)], reset when admins edit channels
+CHANNELS_GENERATION = 0  # Bumped on every channel edit; results read under an older value are not cached
+TASKS_TTL = 30  # Seconds the active-task list is served from memory
+TASKS_CACHE = None  # (loaded_at, {task_id: (task_id, description, reward, requirements, task_link)})
+BALANCE_TTL = 3600  # Seconds a "💰 My Balance" summary is served from memory
+BALANCE_CACHE = {}  # user_id -> (loaded_at, balance, total_earned, total_withdrawn), dropped on every balance write
+BALANCE_GENERATION = {}  # user_id -> number of balance writes; a read that saw an older count is not cached
+BALANCE_READ_AT = {}  # user_id -> last get_balance_summary call; refresh_balance_cache keeps only these warm
+BALANCE_REFRESH_INTERVAL = 1800  # Seconds between refresh_caches runs
+
+# Conversation states
+WITHDRAW_METHOD, WITHDRAW_AMOUNT, WITHDRAW_DETAILS, SUBMIT_PHOTO = range(4)
+MENU_BUTTONS = ["📋 Available Tasks", "💰 My Balance", "📊 My Profile", "💳 Withdraw", "📞 Support", "📜 History"]
+
+# Deep-link style commands (/submit_12, /reject_7 reason), matched once by the dispatcher
+SUBMIT_CMD_RE = re.compile(r'^/submit_(\d+)(?:@\w+)?(?:\s+(.*))?$', re.DOTALL)
+# /approve_12, /reject_12 reason, /approve_withdraw_12 txn, /reject_withdraw_12 reason
+# (the ID only has to start with a digit so the handlers can answer "Invalid ... ID" for /approve_12abc)
+ADMIN_ACTION_CMD_RE = re.compile(
+    r'^/(?P<cmd>approve_withdraw|reject_withdraw|approve|reject)_(?P<id>\d[^\s@]*)(?:@\w+)?(?:\s+(?P<rest>.*))?$',
+    re.DOTALL
+)
+
+# Main menu keyboard (static, built once)
+MAIN_KEYBOARD = ReplyKeyboardMarkup([
+    [KeyboardButton("📋 Available Tasks"), KeyboardButton("💰 My Balance")],
+    [KeyboardButton("📊 My Profile"), KeyboardButton("💳 Withdraw")],
+    [KeyboardButton("📞 Support"), KeyboardButton("📜 History")]
+], resize_keyboard=True)
+
+# Line icons for the profile and history screens
+TXN_EMOJI = {'credit': "➕", 'debit': "➖"}  # Anything else (withdrawals, refunds) shows 💳
+STATUS_EMOJI = {'approved': "✅", 'completed': "✅", 'rejected': "❌"}  # Anything still open shows ⏳
+
+# Admin panel keyboard and prompts (static, built once)
+ADMIN_PANEL_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Add Task", callback_data="admin_add_task")],
+    [InlineKeyboardButton("❌ Remove Task", callback_data="admin_remove_task")],
+    [InlineKeyboardButton("📋 All Tasks", callback_data="admin_list_tasks")],
+    [InlineKeyboardButton("👥 All Users", callback_data="admin_list_users")],
+    [InlineKeyboardButton("💳 Pending Withdrawals", callback_data="admin_pending_withdrawals")],
+    [InlineKeyboardButton("📝 Pending Submissions", callback_data="admin_pending_submissions")],
+    [InlineKeyboardButton("💰 Financial Stats", callback_data="admin_financial_stats")],
+    [InlineKeyboardButton("➕ Add Channel", callback_data="admin_add_channel")],
+    [InlineKeyboardButton("❌ Remove Channel", callback_data="admin_remove_channel")],
+    [InlineKeyboardButton("📊 System Stats", callback_data="admin_system_stats")]
+])
+ADMIN_PANEL_TEXT = (
+    "🔐 *Admin Control Panel*\n\n"
+    "Welcome to the secret admin panel.\n"
+    "Select an option below:"
+)
+ADD_TASK_HELP = (
+    "📝 *Add New Task*\n\n"
+    "Please send the task details in this format:\n\n"
+    "Description | Reward | Requirements | Link\n\n"
+    "Example:\n"
+    "Join and post comment | 5 | Must join channel | https://t.me/...\n\n"
+    "Requirements and Link are optional."
+)
+ADD_CHANNEL_HELP = (
+    "📢 *Add Required Channel*\n\n"
+    "Please send the channel details in this format:\n\n"
+    "Channel ID | Channel Name | Type\n\n"
+    "Example:\n"
+    "@mychannel | My Channel | public\n\n"
+    "Channel ID can be @username or channel ID number.\n"
+    "Type: public or private"
+)
+
+# Hot-path SQL, kept as constants so every call site shares one prepared-statement cache slot
+SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%S', 'now')"  # UTC, same format as now_iso(), stamped by SQLite itself
+SQL_GET_USER = "SELECT is_verified, bot_blocked FROM users WHERE user_id = ?"
+SQL_INSERT_USER = ("INSERT OR IGNORE INTO users (user_id, username, first_name, last_name, joined_date, last_active) "
+                   f"VALUES (?,?,?,?,{SQL_NOW},{SQL_NOW})")
+SQL_GET_USER_VERIFY = "SELECT is_verified, is_blocked FROM users WHERE user_id = ?"
+SQL_GET_USER_STATS = "SELECT balance, completed_tasks, pending_tasks FROM users WHERE user_id = ?"
+SQL_GET_BALANCE = "SELECT balance FROM users WHERE user_id = ?"
+SQL_GET_BALANCE_SUMMARY = "SELECT balance, total_earned, total_withdrawn FROM users WHERE user_id = ?"
+SQL_GET_PROFILE = ("SELECT balance, total_earned, total_withdrawn, completed_tasks, pending_tasks, joined_date, "
+                   "is_verified FROM users WHERE user_id = ?")
+SQL_GET_WITHDRAW_CHECK = "SELECT balance, is_verified, is_blocked FROM users WHERE user_id = ?"
+SQL_GET_SUBMIT_CHECK = ("SELECT u.is_verified, u.is_blocked, "
+                        "EXISTS(SELECT 1 FROM submissions WHERE user_id = u.user_id AND task_id = ? AND status = 'pending') "
+                        "FROM users u WHERE u.user_id = ?")
+SQL_HAS_APPROVED = ("SELECT EXISTS(SELECT 1 FROM submissions "
+                    "WHERE user_id = ? AND task_id = ? AND status = 'approved')")
+SQL_INSERT_SUBMISSION = ("INSERT INTO submissions (user_id, task_id, screenshot, status, submitted_date, ip_address) "
+                         f"VALUES (?,?,?,?,{SQL_NOW},?) RETURNING submission_id")
+SQL_INC_PENDING = f"UPDATE users SET pending_tasks = pending_tasks + 1, last_active = {SQL_NOW} WHERE user_id = ?"
+SQL_INSERT_WITHDRAWAL = ("INSERT INTO withdrawals (user_id, amount, method, account_details, status, requested_date) "
+                         f"VALUES (?,?,?,?,?,{SQL_NOW})")
+SQL_DEBIT_WITHDRAWAL = "UPDATE users SET balance = ?, total_withdrawn = total_withdrawn + ? WHERE user_id = ?"
+SQL_INSERT_TRANSACTION = ("INSERT INTO transactions "
+                          "(user_id, type, amount, balance_before, balance_after, description, timestamp, admin_id) "
+                          "VALUES (?,?,?,?,?,?,?,?)")
+SQL_RECENT_TRANSACTIONS = ("SELECT type, amount, description, timestamp FROM transactions WHERE user_id = ? "
+                           "ORDER BY timestamp DESC, transaction_id DESC LIMIT ?")
+# "📜 History" in one statement: (kind, id, ...4 columns, date) with kind 's'ubmission, 't'ransaction or 'w'ithdrawal
+SQL_USER_HISTORY = '''SELECT * FROM (SELECT 't', transaction_id, type, amount, description, timestamp
+                                    FROM transactions WHERE user_id = ?
+                                    ORDER BY timestamp DESC, transaction_id DESC LIMIT 10)
+                      UNION ALL
+                      SELECT * FROM (SELECT 's', s.submission_id, s.task_id, t.description, s.status, s.submitted_date
+                                    FROM submissions s JOIN tasks t ON s.task_id = t.task_id
+                                    WHERE s.user_id = ?
+                                    ORDER BY s.submitted_date DESC, s.submission_id DESC LIMIT 5)
+                      UNION ALL
+                      SELECT * FROM (SELECT 'w', withdrawal_id, amount, method, status, requested_date
+                                    FROM withdrawals WHERE user_id = ?
+                                    ORDER BY requested_date DESC, withdrawal_id DESC LIMIT 5)
+                      ORDER BY 1, 6 DESC, 2 DESC'''
+SQL_ACTIVE_TASKS = "SELECT task_id, description, reward, requirements, task_link FROM tasks WHERE is_active = 1"
+SQL_REQUIRED_CHANNELS = "SELECT channel_id, channel_name FROM channels WHERE is_required = 1"
+SQL_UPSERT_IP = (f"INSERT INTO ip_addresses (ip_address, user_id, first_seen, last_seen) VALUES (?,?,{SQL_NOW},{SQL_NOW}) "
+                 "ON CONFLICT(ip_address) DO UPDATE SET last_seen = excluded.last_seen "
+                 "WHERE ip_addresses.user_id = excluded.user_id")
+SQL_SET_VERIFIED = "UPDATE users SET verified_ip = ?, is_verified = 1 WHERE user_id = ?"
+# bot_blocked: the user blocked the bot (Telegram said Forbidden). is_blocked is the admin ban and is never
+# touched by these, so a banned user can't lift it by sending /start
+SQL_SET_BOT_BLOCKED = "UPDATE users SET bot_blocked = ? WHERE user_id = ?"
+SQL_BROADCAST_RECIPIENTS = ("SELECT user_id FROM users WHERE is_verified = 1 AND is_blocked = 0 AND bot_blocked = 0 "
+                            "AND user_id > ? ORDER BY user_id LIMIT ?")
+
+# Admin screens
+SQL_PENDING_SUBMISSIONS = '''SELECT s.submission_id, s.user_id, s.task_id, s.submitted_date,
+                                    u.username, t.description, t.reward
+                             FROM submissions s
+                             JOIN users u ON s.user_id = u.user_id
+                             JOIN tasks t ON s.task_id = t.task_id
+                             WHERE s.status = 'pending'
+                             ORDER BY s.submitted_date, s.submission_id
+                             LIMIT 10'''
+SQL_PENDING_WITHDRAWALS = '''SELECT w.withdrawal_id, w.user_id, w.amount, w.method,
+                                    w.account_details, w.requested_date, u.username
+                             FROM withdrawals w
+                             JOIN users u ON w.user_id = u.user_id
+                             WHERE w.status = 'pending'
+                             ORDER BY w.requested_date, w.withdrawal_id
+                             LIMIT ? OFFSET ?'''
+SQL_LIST_USERS = '''SELECT user_id, username, first_name, balance, completed_tasks,
+                           pending_tasks, is_verified, is_blocked, substr(joined_date, 1, 10)
+                    FROM users
+                    ORDER BY joined_date DESC, user_id DESC
+                    LIMIT ? OFFSET ?'''
+# TOTAL() is 0.0 on no rows, unlike SUM()
+SQL_FINANCIAL_STATS = '''SELECT
+                             (SELECT TOTAL(balance) FROM users),
+                             (SELECT TOTAL(amount) FROM withdrawals WHERE status = 'completed'),
+                             (SELECT TOTAL(amount) FROM withdrawals WHERE status = 'pending'),
+                             (SELECT TOTAL(t.reward) FROM submissions s
+                              JOIN tasks t ON s.task_id = t.task_id
+                              WHERE s.status = 'approved'),
+                             (SELECT COUNT(*) FROM users WHERE is_verified = 1),
+                             (SELECT COUNT(*) FROM tasks WHERE is_active = 1)'''
+SQL_TODAY_TRANSACTIONS = '''SELECT TOTAL(CASE WHEN type = 'credit' THEN amount END),
+                                   TOTAL(CASE WHEN type IN ('debit', 'withdrawal_request') THEN amount END)
+                            FROM transactions
+                            WHERE date(timestamp) = date('now')'''
+SQL_SYSTEM_STATS = '''SELECT u.total, u.verified, u.blocked, t.active,
+                             s.pending, s.approved, w.pending, w.completed, c.total
+                      FROM (SELECT COUNT(*) AS total,
+                                   COUNT(*) FILTER (WHERE is_verified = 1) AS verified,
+                                   COUNT(*) FILTER (WHERE is_blocked = 1) AS blocked
+                            FROM users) u,
+                           (SELECT COUNT(*) AS active FROM tasks WHERE is_active = 1) t,
+                           (SELECT COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                                   COUNT(*) FILTER (WHERE status = 'approved') AS approved
+                            FROM submissions) s,
+                           (SELECT COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                                   COUNT(*) FILTER (WHERE status = 'completed') AS completed
+                            FROM withdrawals) w,
+                           (SELECT COUNT(*) AS total FROM channels) c'''
+
+# Admin actions: the status guard in each WHERE makes a repeated click a no-op, and the
+# arithmetic happens in SQL so there is no read-modify-write gap
+SQL_APPROVE_SUBMISSION = (f"UPDATE submissions SET status = 'approved', reviewed_date = {SQL_NOW}, reviewed_by = ? "
+                          "WHERE submission_id = ? AND status = 'pending' "
+                          "RETURNING user_id, task_id, (SELECT reward FROM tasks WHERE task_id = submissions.task_id)")
+SQL_REJECT_SUBMISSION = (f"UPDATE submissions SET status = 'rejected', reviewed_date = {SQL_NOW}, reviewed_by = ?, notes = ? "
+                         "WHERE submission_id = ? AND status = 'pending' RETURNING user_id, task_id")
+SQL_CREDIT_TASK_REWARD = ("UPDATE users SET balance = balance + ?, total_earned = total_earned + ?, "
+                          "completed_tasks = completed_tasks + 1, pending_tasks = pending_tasks - 1 "
+                          "WHERE user_id = ? RETURNING balance")
+SQL_DEC_PENDING = "UPDATE users SET pending_tasks = pending_tasks - 1 WHERE user_id = ?"
+SQL_COMPLETE_WITHDRAWAL = (f"UPDATE withdrawals SET status = 'completed', processed_date = {SQL_NOW}, transaction_id = ? "
+                           "WHERE withdrawal_id = ? AND status = 'pending' RETURNING user_id, amount, method")
+SQL_REJECT_WITHDRAWAL = (f"UPDATE withdrawals SET status = 'rejected', processed_date = {SQL_NOW}, admin_notes = ? "
+                         "WHERE withdrawal_id = ? AND status = 'pending' RETURNING user_id, amount")
+SQL_ADD_BALANCE = "UPDATE users SET balance = balance + ? WHERE user_id = ? RETURNING balance"
+SQL_ADJUST_BALANCE = "UPDATE users SET balance = balance + ?, total_earned = total_earned + ? WHERE user_id = ?"
+# One statement text whatever the batch size: the ids arrive as a single JSON array
+SQL_GET_BALANCES = "SELECT user_id, balance FROM users WHERE user_id IN (SELECT value FROM json_each(?))"
+SQL_GET_BALANCE_SUMMARIES = ("SELECT user_id, balance, total_earned, total_withdrawn FROM users "
+                             "WHERE user_id IN (SELECT value FROM json_each(?))")
+SQL_INSERT_TASK = ("INSERT INTO tasks (description, reward, requirements, task_link, created_date, created_by, is_active) "
+                   f"VALUES (?,?,?,?,{SQL_NOW},?,?)")
+SQL_DEACTIVATE_TASKS = ("UPDATE tasks SET is_active = 0 "
+                        "WHERE task_id IN (SELECT value FROM json_each(?)) RETURNING task_id")
+SQL_UPSERT_CHANNEL = ("INSERT OR REPLACE INTO channels "
+                      "(channel_id, channel_name, channel_type, is_required, added_date, added_by) "
+                      f"VALUES (?,?,?,?,{SQL_NOW},?)")
+SQL_DELETE_CHANNEL = "DELETE FROM channels WHERE channel_id = ?"
+
+# Read-only statements compiled on every new pool connection (bound to 0, so they match nothing)
+PRIMED_SQL = (SQL_GET_USER, SQL_GET_USER_VERIFY, SQL_GET_USER_STATS, SQL_GET_BALANCE, SQL_GET_BALANCE_SUMMARY,
+              SQL_GET_PROFILE, SQL_GET_WITHDRAW_CHECK, SQL_GET_SUBMIT_CHECK, SQL_HAS_APPROVED, SQL_RECENT_TRANSACTIONS)
 
 # Database setup
 def init_database():
-    conn = sqlite3.connect('task_bot.db')
+    conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     # Users table with IP tracking
@@ -44,7 +300,11 @@ def init_database():
                   last_active TEXT,
                   verified_ip TEXT,
                   is_verified INTEGER DEFAULT 0,
-                  is_blocked INTEGER DEFAULT 0)''')
+                  is_blocked INTEGER DEFAULT 0,
+                  bot_blocked INTEGER DEFAULT 0)''')
+    # Databases created before bot_blocked existed
+    if 'bot_blocked' not in {row[1] for row in c.execute("PRAGMA table_info(users)")}:
+        c.execute("ALTER TABLE users ADD COLUMN bot_blocked INTEGER DEFAULT 0")
     
     # IP tracking table
     c.execute('''CREATE TABLE IF NOT EXISTS ip_addresses
@@ -118,6 +378,46 @@ def init_database():
                   setting_value TEXT,
                   updated_date TEXT)''')
     
+    # Rows written before timestamps moved to UTC hold datetime.now().isoformat(): local time with
+    # microseconds. Rewrite them once into the current UTC, whole-second format; new values are exactly
+    # 19 characters, so later startups match nothing
+    for table, column in (('users', 'joined_date'), ('users', 'last_active'),
+                          ('ip_addresses', 'first_seen'), ('ip_addresses', 'last_seen'),
+                          ('tasks', 'created_date'), ('channels', 'added_date'), ('transactions', 'timestamp'),
+                          ('submissions', 'submitted_date'), ('submissions', 'reviewed_date'),
+                          ('withdrawals', 'requested_date'), ('withdrawals', 'processed_date')):
+        c.execute(f"UPDATE {table} SET {column} = strftime('%Y-%m-%dT%H:%M:%S', {column}, 'utc') "
+                  f"WHERE length({column}) > 19")
+
+    # Indexes for the hot lookups
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_active ON tasks(is_active) WHERE is_active = 1")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_user_task_status ON submissions(user_id, task_id, status)")
+    # Per-user newest-first walks for History and the profile: the id is the ORDER BY tiebreak, so with it
+    # as the last column each branch reads its LIMIT rows straight off the index without sorting (only
+    # SQL_USER_HISTORY's outer ORDER BY still sorts, over the <= 20 merged rows)
+    for old_index in ('idx_transactions_user_ts', 'idx_submissions_user_date', 'idx_withdrawals_user_date'):
+        c.execute(f"DROP INDEX IF EXISTS {old_index}")  # Same columns without the id
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_ts_id "
+              "ON transactions(user_id, timestamp DESC, transaction_id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_user_date_id "
+              "ON submissions(user_id, submitted_date DESC, submission_id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_withdrawals_user_date_id "
+              "ON withdrawals(user_id, requested_date DESC, withdrawal_id DESC)")
+    # Expression index for the "today" totals: covers date(timestamp) = date('now') without touching the table
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_type ON transactions(date(timestamp), type, amount)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_channels_required ON channels(is_required) WHERE is_required = 1")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_withdrawals_user ON withdrawals(user_id, status)")
+    # Admin queues and stats: pending lists stay O(pending), status totals read only the index
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_pending ON submissions(submitted_date) WHERE status = 'pending'")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_status_task ON submissions(status, task_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_withdrawals_pending ON withdrawals(requested_date) WHERE status = 'pending'")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_withdrawals_status_amount ON withdrawals(status, amount)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_verified ON users(is_verified, is_blocked, user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_joined ON users(joined_date)")
+
+    # Refresh planner statistics so the indexes get picked up
+    c.execute("ANALYZE")
+
     conn.commit()
     conn.close()
 
@@ -125,19 +425,140 @@ def init_database():
 init_database()
 
 # Helper Functions
-def get_db():
-    return sqlite3.connect('task_bot.db')
+_NOW_CACHE = (0, '')  # (unix second, ISO string)
+
+def now_iso() -> str:
+    """Current UTC time as ISO-8601, formatted at most once per second"""
+    global _NOW_CACHE
+    sec = int(time.time())
+    if _NOW_CACHE[0] != sec:
+        _NOW_CACHE = (sec, time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec)))
+    return _NOW_CACHE[1]
+
+async def connect_db():
+    """Open a tuned aiosqlite connection for the pool"""
+    conn = await aiosqlite.connect(DB_PATH, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    # WAL + NORMAL sync: readers don't block the writer and commits skip the extra fsync
+    await conn.executescript('''PRAGMA journal_mode = WAL;
+                                PRAGMA synchronous = NORMAL;
+                                PRAGMA busy_timeout = 5000;
+                                PRAGMA temp_store = MEMORY;
+                                PRAGMA cache_size = -65536;
+                                PRAGMA mmap_size = 268435456;
+                                PRAGMA foreign_keys = ON;''')
+    # Warm the statement cache so the first real request skips the parse
+    for sql in PRIMED_SQL:
+        await conn.execute_fetchall(sql, (0,) * sql.count('?'))
+    return conn
+
+def db():
+    """Borrow a pooled read connection (use with `async with`)"""
+    return POOL.connection()
+
+@asynccontextmanager
+async def write_db():
+    """Hold the writer connection; writers queue on WRITE_LOCK rather than SQLite's busy timeout"""
+    async with WRITE_LOCK:
+        yield WRITER
+
+@asynccontextmanager
+async def tx():
+    """Run the block as one BEGIN IMMEDIATE ... COMMIT on a write connection, rolling back on error"""
+    async with write_db() as conn:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
 
 def log_transaction(user_id, type, amount, balance_before, balance_after, description, admin_id=None):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''INSERT INTO transactions 
-                 (user_id, type, amount, balance_before, balance_after, description, timestamp, admin_id)
-                 VALUES (?,?,?,?,?,?,?,?)''',
-              (user_id, type, amount, balance_before, balance_after, description, 
-               datetime.datetime.now().isoformat(), admin_id))
-    conn.commit()
-    conn.close()
+    """Queue a transaction row for the audit log; _tx_flusher writes it shortly after"""
+    TX_Q.put_nowait((user_id, type, amount, balance_before, balance_after, description, now_iso(), admin_id))
+
+async def _tx_flusher():
+    """Write queued transaction rows in batches, one commit per flush window"""
+    failures = 0
+    while True:
+        batch = [await TX_Q.get()]
+        while len(batch) < TX_BATCH and not TX_Q.empty():
+            batch.append(TX_Q.get_nowait())
+        delay = TX_FLUSH_INTERVAL
+        try:
+            async with tx() as conn:
+                await conn.executemany(SQL_INSERT_TRANSACTION, batch)
+            failures = 0
+        except Exception:
+            # Put the rows back (each row carries its own timestamp) and back off before retrying
+            failures += 1
+            delay = min(TX_FLUSH_INTERVAL * 2 ** failures, TX_RETRY_MAX)
+            logging.exception(f"Failed to write {len(batch)} transaction rows, retrying in {delay:.1f}s")
+            for row in batch:
+                TX_Q.put_nowait(row)
+        except asyncio.CancelledError:
+            for row in batch:
+                TX_Q.put_nowait(row)
+            raise
+        finally:
+            for _ in batch:
+                TX_Q.task_done()
+        await asyncio.sleep(delay)
+
+async def bulk_credit(rows, admin_id=None):
+    """Apply [(user_id, amount, description), ...] balance changes in one transaction.
+    
+    Negative amounts are debits and are skipped when the balance doesn't cover them; credits
+    also count toward total_earned. Returns one (balance_before, balance_after) per row, or
+    None where the user doesn't exist.
+    """
+    user_ids = json.dumps(list({user_id for user_id, _, _ in rows}))
+    results, updates, logs = [], [], []
+    async with tx() as conn:
+        # BEGIN IMMEDIATE holds the write lock, so these balances stay exact until COMMIT
+        balances = dict(await conn.execute_fetchall(SQL_GET_BALANCES, (user_ids,)))
+        for user_id, amount, description in rows:
+            if user_id not in balances:
+                results.append(None)
+                continue
+            before = balances[user_id]
+            if before + amount < 0:
+                results.append((before, before))
+                continue
+            after = balances[user_id] = before + amount
+            results.append((before, after))
+            updates.append((amount, max(amount, 0), user_id))
+            logs.append((user_id, 'credit' if amount >= 0 else 'debit', abs(amount), before, after, description))
+        await conn.executemany(SQL_ADJUST_BALANCE, updates)
+    
+    # Audit rows and cache invalidation happen only once the balance changes are committed
+    invalidate_balance(*(user_id for _, _, user_id in updates))
+    for log in logs:
+        log_transaction(*log, admin_id)
+    return results
+
+def notify_admins(text: str, photo: str = None):
+    """Queue a notification for every admin; the notify workers deliver it"""
+    for admin_id in CFG.admin_ids:
+        NOTIFY_Q.put_nowait((admin_id, text, photo))
+
+async def _notify_worker(bot):
+    """Deliver queued admin notifications, backing off when Telegram rate-limits us"""
+    while True:
+        admin_id, text, photo = await NOTIFY_Q.get()
+        try:
+            if photo:
+                await bot.send_photo(chat_id=admin_id, photo=photo, caption=text, parse_mode=ParseMode.MARKDOWN)
+            else:
+                await bot.send_message(chat_id=admin_id, text=text, parse_mode=ParseMode.MARKDOWN)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            NOTIFY_Q.put_nowait((admin_id, text, photo))
+        except Exception:
+            logging.exception(f"Failed to notify admin {admin_id}")
+        finally:
+            NOTIFY_Q.task_done()
 
 def get_user_ip(update: Update) -> str:
     """Get user's IP address from update"""
@@ -150,86 +571,180 @@ def get_user_ip(update: Update) -> str:
         return "0.0.0.0"  # Placeholder
     return "0.0.0.0"
 
-def check_channel_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> tuple:
+async def get_required_channels() -> list:
+    """Required channels, served from memory until an admin edits them"""
+    global REQUIRED_CHANNELS_CACHE
+    if REQUIRED_CHANNELS_CACHE is not None:
+        return REQUIRED_CHANNELS_CACHE
+    
+    generation = CHANNELS_GENERATION
+    async with db() as conn:
+        channels = await conn.execute_fetchall(SQL_REQUIRED_CHANNELS)
+    # An admin edit that landed while we read may not be in `channels`; use it once but don't keep it
+    if generation == CHANNELS_GENERATION:
+        REQUIRED_CHANNELS_CACHE = channels
+    return channels
+
+def invalidate_channels_cache():
+    """Forget cached channels and membership results after an admin edit"""
+    global REQUIRED_CHANNELS_CACHE, CHANNELS_GENERATION
+    REQUIRED_CHANNELS_CACHE = None
+    CHANNELS_GENERATION += 1
+    MEMBERSHIP_CACHE.clear()
+
+async def get_active_tasks() -> dict:
+    """Active tasks keyed by task_id, refreshed at most every TASKS_TTL seconds"""
+    global TASKS_CACHE
+    if TASKS_CACHE is not None and time.monotonic() - TASKS_CACHE[0] < TASKS_TTL:
+        return TASKS_CACHE[1]
+    
+    async with db() as conn:
+        rows = await conn.execute_fetchall(SQL_ACTIVE_TASKS)
+    TASKS_CACHE = (time.monotonic(), {row[0]: row for row in rows})
+    return TASKS_CACHE[1]
+
+def invalidate_tasks_cache():
+    """Force the next get_active_tasks() call to reload from the database"""
+    global TASKS_CACHE
+    TASKS_CACHE = None
+
+async def get_balance_summary(user_id: int) -> tuple:
+    """(balance, total_earned, total_withdrawn) for a user, cached for BALANCE_TTL seconds"""
+    BALANCE_READ_AT[user_id] = time.monotonic()
+    cached = BALANCE_CACHE.get(user_id)
+    if cached and time.monotonic() - cached[0] < BALANCE_TTL:
+        return cached[1:]
+    
+    # A write that commits and invalidates while we read could leave our snapshot stale
+    generation = BALANCE_GENERATION.get(user_id, 0)
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_BALANCE_SUMMARY, (user_id,))
+        summary = tuple(await cur.fetchone())
+    if BALANCE_GENERATION.get(user_id, 0) == generation:
+        BALANCE_CACHE[user_id] = (time.monotonic(), *summary)
+    return summary
+
+async def refresh_balance_cache(context: ContextTypes.DEFAULT_TYPE):
+    """Job: reload balance summaries that would expire before the next run, for users who still read them.
+    
+    Entries nobody has read for BALANCE_TTL are evicted instead, so the cache and the reload list stay
+    the size of the active set.
+    """
+    now = time.monotonic()
+    due = BALANCE_TTL - BALANCE_REFRESH_INTERVAL
+    for user_id in [user_id for user_id, read_at in BALANCE_READ_AT.items() if now - read_at >= BALANCE_TTL]:
+        del BALANCE_READ_AT[user_id]
+    # A generation only matters to a read in flight, and every read first stamps BALANCE_READ_AT,
+    # so users without a recent read can lose theirs (they'd restart at 0 with nothing to compare)
+    for user_id in [user_id for user_id in BALANCE_GENERATION if user_id not in BALANCE_READ_AT]:
+        del BALANCE_GENERATION[user_id]
+    
+    stale = {}  # user_id -> BALANCE_GENERATION before the reload
+    for user_id, entry in list(BALANCE_CACHE.items()):
+        if now - entry[0] < due:
+            continue
+        if user_id in BALANCE_READ_AT:
+            stale[user_id] = BALANCE_GENERATION.get(user_id, 0)
+        else:
+            del BALANCE_CACHE[user_id]
+    if not stale:
+        return
+    
+    async with db() as conn:
+        rows = await conn.execute_fetchall(SQL_GET_BALANCE_SUMMARIES, (json.dumps(list(stale)),))
+    summaries = {row[0]: tuple(row[1:]) for row in rows}
+    
+    loaded_at = time.monotonic()
+    for user_id, generation in stale.items():
+        # Same guard as get_balance_summary: a write during the query makes our row stale
+        if BALANCE_GENERATION.get(user_id, 0) != generation:
+            continue
+        if user_id in summaries:
+            BALANCE_CACHE[user_id] = (loaded_at, *summaries[user_id])
+        else:
+            BALANCE_CACHE.pop(user_id, None)
+
+async def refresh_caches(context: ContextTypes.DEFAULT_TYPE):
+    """Job: drop expired membership results and refresh or evict balance summaries"""
+    now = time.monotonic()
+    for user_id in [user_id for user_id, entry in MEMBERSHIP_CACHE.items() if now - entry[0] >= MEMBERSHIP_TTL]:
+        del MEMBERSHIP_CACHE[user_id]
+    await refresh_balance_cache(context)
+
+def invalidate_balance(*user_ids):
+    """Drop cached balance summaries; call after the balance change is committed"""
+    for user_id in user_ids:
+        BALANCE_CACHE.pop(user_id, None)
+        BALANCE_GENERATION[user_id] = BALANCE_GENERATION.get(user_id, 0) + 1
+
+async def check_channel_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> tuple:
     """Check if user is member of all required channels"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT channel_id, channel_name FROM channels WHERE is_required = 1")
-    channels = c.fetchall()
-    conn.close()
+    now = time.monotonic()
+    cached = MEMBERSHIP_CACHE.get(user_id)
+    if cached and now - cached[0] < MEMBERSHIP_TTL:
+        return cached[1], cached[2]
+    
+    generation = CHANNELS_GENERATION
+    channels = await get_required_channels()
+    
+    # Query all channels concurrently so the check costs one round-trip, not one per channel
+    coros = [
+        context.bot.get_chat_member(
+            chat_id=channel_id if channel_id.startswith('@') else f"@{channel_id}",
+            user_id=user_id
+        )
+        for channel_id, channel_name in channels
+    ]
+    results = await asyncio.gather(*coros, return_exceptions=True)
     
     not_joined = []
-    for channel_id, channel_name in channels:
-        try:
-            # Remove @ if present
-            if channel_id.startswith('@'):
-                chat_id = channel_id
-            else:
-                chat_id = f"@{channel_id}"
-            
-            member = context.bot.get_chat_member(chat_id=chat_id, user_id=user_id)
-            if member.status in ['left', 'kicked']:
-                not_joined.append(channel_name or channel_id)
-        except Exception as e:
-            logging.error(f"Error checking channel {channel_id}: {e}")
+    for (channel_id, channel_name), member in zip(channels, results):
+        if isinstance(member, Exception):
+            logging.error(f"Error checking channel {channel_id}: {member}")
             # If can't check, assume not joined for security
             not_joined.append(channel_name or channel_id)
+        elif member.status in ['left', 'kicked']:
+            not_joined.append(channel_name or channel_id)
     
+    if generation == CHANNELS_GENERATION:
+        MEMBERSHIP_CACHE[user_id] = (now, len(not_joined) == 0, not_joined)
     return len(not_joined) == 0, not_joined
 
-def verify_user_ip(user_id: int, ip_address: str) -> bool:
+async def verify_user_ip(user_id: int, ip_address: str) -> bool:
     """Verify if IP is unique for this user"""
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Check if IP already exists for another user
-    c.execute("SELECT user_id FROM ip_addresses WHERE ip_address = ?", (ip_address,))
-    result = c.fetchone()
-    
-    if result and result[0] != user_id:
-        conn.close()
-        return False
-    
-    # Record or update IP
-    c.execute('''INSERT OR REPLACE INTO ip_addresses (ip_address, user_id, first_seen, last_seen)
-                 VALUES (?, ?, 
-                         COALESCE((SELECT first_seen FROM ip_addresses WHERE ip_address = ?), ?),
-                         ?)''',
-              (ip_address, user_id, ip_address, datetime.datetime.now().isoformat(), 
-               datetime.datetime.now().isoformat()))
-    
-    # Update user verification
-    c.execute("UPDATE users SET verified_ip = ?, is_verified = 1 WHERE user_id = ?", 
-              (ip_address, user_id))
-    
-    conn.commit()
-    conn.close()
+    async with tx() as conn:
+        # Record the IP, or refresh last_seen if it is already ours; no row changes if another user owns it
+        cur = await conn.execute(SQL_UPSERT_IP, (ip_address, user_id))
+        if cur.rowcount == 0:
+            return False
+        
+        # Update user verification
+        await conn.execute(SQL_SET_VERIFIED, (ip_address, user_id))
     return True
 
 # User Commands
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
     user = update.effective_user
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Check if user exists
-    c.execute("SELECT * FROM users WHERE user_id = ?", (user.id,))
-    existing_user = c.fetchone()
-    
-    if not existing_user:
-        # Create new user
-        c.execute('''INSERT INTO users 
-                     (user_id, username, first_name, last_name, joined_date, last_active)
-                     VALUES (?,?,?,?,?,?)''',
-                  (user.id, user.username, user.first_name, user.last_name,
-                   datetime.datetime.now().isoformat(), datetime.datetime.now().isoformat()))
-        conn.commit()
-    
-    conn.close()
+    async with db() as conn:
+        # Check if user exists, fetching the verification state in the same query
+        cur = await conn.execute(SQL_GET_USER, (user.id,))
+        existing_user = await cur.fetchone()
+    
+    if existing_user:
+        is_verified, bot_blocked = existing_user
+        if bot_blocked:
+            # They blocked the bot during a broadcast; messaging us again means they unblocked it
+            async with tx() as conn:
+                await conn.execute(SQL_SET_BOT_BLOCKED, (0, user.id))
+    else:
+        # Create new user (OR IGNORE: a concurrent /start may have inserted it already)
+        async with tx() as conn:
+            await conn.execute(SQL_INSERT_USER, (user.id, user.username, user.first_name, user.last_name))
+        is_verified = 0
     
     # Check channel membership
-    is_member, not_joined = check_channel_membership(user.id, context)
+    is_member, not_joined = await check_channel_membership(user.id, context)
     
     if not is_member:
         # Create channel join buttons
@@ -251,12 +766,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Check IP verification
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT is_verified, verified_ip FROM users WHERE user_id = ?", (user.id,))
-    is_verified, verified_ip = c.fetchone()
-    conn.close()
-    
     if not is_verified:
         # Request IP verification
         keyboard = [[InlineKeyboardButton("🌐 Verify IP Address", callback_data="verify_ip")]]
@@ -280,19 +789,9 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Get user data
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT balance, completed_tasks, pending_tasks FROM users WHERE user_id = ?", (user.id,))
-    balance, completed, pending = c.fetchone()
-    conn.close()
-    
-    # Create main menu keyboard
-    keyboard = [
-        [KeyboardButton("📋 Available Tasks"), KeyboardButton("💰 My Balance")],
-        [KeyboardButton("📊 My Profile"), KeyboardButton("💳 Withdraw")],
-        [KeyboardButton("📞 Support"), KeyboardButton("📜 History")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_USER_STATS, (user.id,))
+        balance, completed, pending = await cur.fetchone()
     
     welcome_text = (
         f"👋 Welcome back, {user.first_name}!\n\n"
@@ -303,9 +802,9 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     if update.message:
-        await update.message.reply_text(welcome_text, reply_markup=reply_markup)
+        await update.message.reply_text(welcome_text, reply_markup=MAIN_KEYBOARD)
     else:
-        await update.callback_query.message.reply_text(welcome_text, reply_markup=reply_markup)
+        await update.callback_query.message.reply_text(welcome_text, reply_markup=MAIN_KEYBOARD)
 
 async def handle_verification(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle verification callbacks"""
@@ -315,8 +814,9 @@ async def handle_verification(update: Update, context: ContextTypes.DEFAULT_TYPE
     user = query.from_user
     
     if query.data == "verify_channels":
-        # Recheck channel membership
-        is_member, not_joined = check_channel_membership(user.id, context)
+        # Recheck channel membership (the user says they just joined, so skip the cache)
+        MEMBERSHIP_CACHE.pop(user.id, None)
+        is_member, not_joined = await check_channel_membership(user.id, context)
         
         if is_member:
             await query.edit_message_text(
@@ -363,7 +863,7 @@ async def handle_verification(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
         
         # Verify IP
-        if verify_user_ip(user.id, ip_address):
+        if await verify_user_ip(user.id, ip_address):
             await query.edit_message_text(
                 "✅ *Verification Complete!*\n\n"
                 "You now have full access to the bot.",
@@ -383,24 +883,22 @@ async def show_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Verify user is verified
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT is_verified, is_blocked FROM users WHERE user_id = ?", (user.id,))
-    result = c.fetchone()
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_USER_VERIFY, (user.id,))
+        result = await cur.fetchone()
     
     if not result or not result[0] or result[1]:
         await update.message.reply_text("❌ Please complete verification first using /start")
         return
     
     # Get active tasks
-    c.execute("SELECT task_id, description, reward, requirements, task_link FROM tasks WHERE is_active = 1")
-    tasks = c.fetchall()
-    conn.close()
+    tasks = (await get_active_tasks()).values()
     
     if not tasks:
         await update.message.reply_text("📭 No tasks available at the moment. Check back later!")
         return
     
+    items = []
     for task_id, desc, reward, req, link in tasks:
         task_text = (
             f"📌 *Task #{task_id}*\n\n"
@@ -412,64 +910,48 @@ async def show_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         
         keyboard = [[InlineKeyboardButton("✅ Submit Task", callback_data=f"submit_{task_id}")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(task_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        items.append((task_text, InlineKeyboardMarkup(keyboard)))
+    
+    # Send all task cards concurrently instead of one round-trip after another
+    await asyncio.gather(*(
+        update.message.reply_text(text, reply_markup=markup, parse_mode=ParseMode.MARKDOWN)
+        for text, markup in items
+    ))
 
 async def submit_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle task submission"""
-    # Check if it's a callback or command
+    # Both the submit_<id> button and /submit_<id> are dispatched by regex
+    task_id = int(context.matches[0].group(1))
     if update.callback_query:
         query = update.callback_query
         await query.answer()
-        task_id = int(query.data.split('_')[1])
         user = query.from_user
         message = query.message
     else:
         # Command format: /submit_123
-        if not context.args and not update.message.text.startswith('/submit_'):
-            await update.message.reply_text("Please use /submit_TASKID or click submit button on a task")
-            return
-        
-        if update.message.text.startswith('/submit_'):
-            try:
-                task_id = int(update.message.text.split('_')[1])
-            except:
-                await update.message.reply_text("Invalid task ID format")
-                return
-        else:
-            await update.message.reply_text("Please use /submit_TASKID")
-            return
-        
         user = update.effective_user
         message = update.message
     
-    # Verify user
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT is_verified, is_blocked FROM users WHERE user_id = ?", (user.id,))
-    result = c.fetchone()
+    # Verify user and existing pending submission in one query
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_SUBMIT_CHECK, (task_id, user.id))
+        result = await cur.fetchone()
     
     if not result or not result[0] or result[1]:
         await message.reply_text("❌ Please complete verification first using /start")
-        return
+        return ConversationHandler.END
+    
+    is_verified, is_blocked, has_pending = result
     
     # Check if task exists and is active
-    c.execute("SELECT * FROM tasks WHERE task_id = ? AND is_active = 1", (task_id,))
-    task = c.fetchone()
-    if not task:
+    if task_id not in await get_active_tasks():
         await message.reply_text("❌ Task not found or inactive")
-        return
+        return ConversationHandler.END
     
     # Check if already submitted pending
-    c.execute('''SELECT * FROM submissions 
-                 WHERE user_id = ? AND task_id = ? AND status = 'pending' ''', 
-              (user.id, task_id))
-    if c.fetchone():
+    if has_pending:
         await message.reply_text("⚠️ You already have a pending submission for this task")
-        return
-    
-    conn.close()
+        return ConversationHandler.END
     
     # Ask for screenshot
     context.user_data['pending_submission'] = task_id
@@ -477,12 +959,13 @@ async def submit_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📸 Please send a screenshot of your task completion for Task #{task_id}\n\n"
         "Make sure the screenshot clearly shows the completion proof."
     )
+    return SUBMIT_PHOTO
 
 async def handle_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle screenshot submission"""
     if 'pending_submission' not in context.user_data:
         await update.message.reply_text("Please start a task submission first using /tasks")
-        return
+        return ConversationHandler.END
     
     task_id = context.user_data['pending_submission']
     user = update.effective_user
@@ -491,66 +974,47 @@ async def handle_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Get user IP
     ip_address = get_user_ip(update)
     
-    # Save submission
-    conn = get_db()
-    c = conn.cursor()
+    # Get task details for admin notification
+    task = (await get_active_tasks()).get(task_id)
+    if task is None:
+        await update.message.reply_text("❌ Task not found or inactive")
+        del context.user_data['pending_submission']
+        return ConversationHandler.END
+    task_desc, task_reward = task[1], task[2]
+    
+    # Save submission (check + insert + counter update in one write transaction)
+    async with tx() as conn:
+        # Check if already completed this task
+        cur = await conn.execute(SQL_HAS_APPROVED, (user.id, task_id))
+        already_done = (await cur.fetchone())[0]
+        
+        if not already_done:
+            # Save submission and get its ID
+            cur = await conn.execute(SQL_INSERT_SUBMISSION,
+                                     (user.id, task_id, photo.file_id, 'pending', ip_address))
+            submission_id = (await cur.fetchone())[0]
+            
+            # Update user pending tasks count
+            await conn.execute(SQL_INC_PENDING, (user.id,))
     
-    # Check if already completed this task
-    c.execute('''SELECT * FROM submissions 
-                 WHERE user_id = ? AND task_id = ? AND status = 'approved' ''', 
-              (user.id, task_id))
-    if c.fetchone():
+    if already_done:
         await update.message.reply_text("❌ You have already completed this task")
         del context.user_data['pending_submission']
-        conn.close()
-        return
-    
-    # Save submission
-    c.execute('''INSERT INTO submissions 
-                 (user_id, task_id, screenshot, status, submitted_date, ip_address)
-                 VALUES (?,?,?,?,?,?)''',
-              (user.id, task_id, photo.file_id, 'pending', 
-               datetime.datetime.now().isoformat(), ip_address))
-    
-    # Update user pending tasks count
-    c.execute('''UPDATE users SET pending_tasks = pending_tasks + 1, last_active = ?
-                 WHERE user_id = ?''',
-              (datetime.datetime.now().isoformat(), user.id))
-    
-    conn.commit()
-    
-    # Get submission ID
-    submission_id = c.lastrowid
-    
-    # Get task details for admin notification
-    c.execute("SELECT description, reward FROM tasks WHERE task_id = ?", (task_id,))
-    task_desc, task_reward = c.fetchone()
-    conn.close()
-    
-    # Notify admins
-    for admin_id in ADMIN_IDS:
-        try:
-            admin_text = (
-                f"📥 *New Task Submission*\n\n"
-                f"📋 Submission ID: #{submission_id}\n"
-                f"👤 User: {user.first_name} (@{user.username})\n"
-                f"🆔 User ID: {user.id}\n"
-                f"📝 Task #{task_id}: {task_desc}\n"
-                f"💰 Reward: ₹{task_reward:.2f}\n"
-                f"🕐 Submitted: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-                f"🌐 IP: {ip_address}\n\n"
-                f"Use /approve_{submission_id} or /reject_{submission_id}"
-            )
-            
-            # Send photo to admin
-            await context.bot.send_photo(
-                chat_id=admin_id,
-                photo=photo.file_id,
-                caption=admin_text,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        except:
-            pass
+        return ConversationHandler.END
+    
+    # Notify admins in the background so the user's reply isn't held up
+    admin_text = (
+        f"📥 *New Task Submission*\n\n"
+        f"📋 Submission ID: #{submission_id}\n"
+        f"👤 User: {user.first_name} (@{user.username})\n"
+        f"🆔 User ID: {user.id}\n"
+        f"📝 Task #{task_id}: {task_desc}\n"
+        f"💰 Reward: ₹{task_reward:.2f}\n"
+        f"🕐 Submitted: {now_iso()[:16].replace('T', ' ')} UTC\n"
+        f"🌐 IP: {ip_address}\n\n"
+        f"Use /approve_{submission_id} or /reject_{submission_id}"
+    )
+    notify_admins(admin_text, photo=photo.file_id)
     
     await update.message.reply_text(
         "✅ *Task Submitted Successfully!*\n\n"
@@ -560,26 +1024,12 @@ async def handle_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     del context.user_data['pending_submission']
+    return ConversationHandler.END
 
-async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show user profile"""
-    user = update.effective_user
-    
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''SELECT balance, total_earned, total_withdrawn, completed_tasks, 
-                        pending_tasks, joined_date, is_verified
-                 FROM users WHERE user_id = ?''', (user.id,))
-    balance, total_earned, total_withdrawn, completed, pending, joined, verified = c.fetchone()
-    
-    # Get recent transactions
-    c.execute('''SELECT type, amount, description, timestamp 
-                 FROM transactions WHERE user_id = ? 
-                 ORDER BY timestamp DESC LIMIT 5''', (user.id,))
-    transactions = c.fetchall()
-    conn.close()
-    
-    profile_text = (
+def _format_profile(user, balance, total_earned, total_withdrawn, completed, pending, joined, verified,
+                    transactions) -> str:
+    """Render the profile message; lines are collected in a list and joined once"""
+    parts = [
         f"👤 *Profile - {user.first_name}*\n\n"
         f"🆔 User ID: `{user.id}`\n"
         f"📛 Username: @{user.username or 'Not set'}\n"
@@ -593,37 +1043,102 @@ async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Completed Tasks: {completed}\n"
         f"Pending Tasks: {pending}\n\n"
         f"📜 *Recent Transactions*\n"
-    )
+    ]
+    parts.extend(f"{TXN_EMOJI.get(t[0], '💳')} {t[2][:30]}... ₹{t[1]:.2f} ({t[3][:10]})\n" for t in transactions)
+    if not transactions:
+        parts.append("No recent transactions\n")
+    return "".join(parts)
+
+async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show user profile"""
+    user = update.effective_user
     
-    if transactions:
-        for t in transactions:
-            emoji = "➕" if t[0] == 'credit' else "➖" if t[0] == 'debit' else "💳"
-            profile_text += f"{emoji} {t[2][:30]}... ₹{t[1]:.2f} ({t[3][:10]})\n"
-    else:
-        profile_text += "No recent transactions\n"
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_PROFILE, (user.id,))
+        balance, total_earned, total_withdrawn, completed, pending, joined, verified = await cur.fetchone()
+        
+        # Get recent transactions
+        transactions = await conn.execute_fetchall(SQL_RECENT_TRANSACTIONS, (user.id, 5))
     
+    profile_text = _format_profile(user, balance, total_earned, total_withdrawn, completed, pending, joined, verified,
+                                   transactions)
     await update.message.reply_text(profile_text, parse_mode=ParseMode.MARKDOWN)
 
+async def show_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show balance, lifetime earnings and withdrawals"""
+    user = update.effective_user
+    balance, earned, withdrawn = await get_balance_summary(user.id)
+    
+    await update.message.reply_text(
+        f"💰 *Your Balance*\n\n"
+        f"Current Balance: ₹{balance:.2f}\n"
+        f"Total Earned: ₹{earned:.2f}\n"
+        f"Total Withdrawn: ₹{withdrawn:.2f}",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def _fetch_history(user_id: int) -> tuple[list, list, list]:
+    """(transactions, submissions, withdrawals) for the History screen, in one round-trip.
+    
+    aiosqlite runs the query on the connection's own thread, so the event loop keeps serving
+    other updates meanwhile.
+    """
+    async with db() as conn:
+        rows = await conn.execute_fetchall(SQL_USER_HISTORY, (user_id, user_id, user_id))
+    
+    history = {'t': [], 's': [], 'w': []}
+    for row in rows:
+        history[row[0]].append(row[2:])
+    return history['t'], history['s'], history['w']
+
+async def show_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show recent transactions, submissions and withdrawals"""
+    transactions, submissions, withdrawals = await _fetch_history(update.effective_user.id)
+    
+    parts = ["📜 *Your History*\n\n", "💸 *Recent Transactions*\n"]
+    parts.extend(f"{TXN_EMOJI.get(t[0], '💳')} ₹{t[1]:.2f} - {t[2]:.30s} ({t[3]:.10s})\n" for t in transactions)
+    if not transactions:
+        parts.append("No transactions yet\n")
+    
+    parts.append("\n📋 *Recent Submissions*\n")
+    parts.extend(f"{STATUS_EMOJI.get(s[2], '⏳')} Task #{s[0]}: {s[1]:.20s}... ({s[3]:.10s})\n" for s in submissions)
+    if not submissions:
+        parts.append("No submissions yet\n")
+    
+    parts.append("\n💳 *Recent Withdrawals*\n")
+    parts.extend(f"{STATUS_EMOJI.get(w[2], '⏳')} ₹{w[0]:.2f} via {w[1]} ({w[3]:.10s})\n" for w in withdrawals)
+    if not withdrawals:
+        parts.append("No withdrawals yet\n")
+    
+    history_text = "".join(parts)
+    await update.message.reply_text(history_text, parse_mode=ParseMode.MARKDOWN)
+
+async def show_support(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show support contact"""
+    await update.message.reply_text(
+        f"📞 *Support*\n\n"
+        f"For any issues or questions, contact:\n"
+        f"{CFG.support}\n\n"
+        f"Response time: 24-48 hours",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
 async def withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle withdrawal request"""
     user = update.effective_user
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT balance, is_verified, is_blocked FROM users WHERE user_id = ?", (user.id,))
-    balance, verified, blocked = c.fetchone()
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_WITHDRAW_CHECK, (user.id,))
+        balance, verified, blocked = await cur.fetchone()
     
     if not verified or blocked:
         await update.message.reply_text("❌ Please complete verification first using /start")
-        conn.close()
-        return
-    
-    conn.close()
+        return ConversationHandler.END
     
     # Show withdrawal options
     keyboard = [
-        [InlineKeyboardButton(f"💳 UPI (Min ₹{MIN_WITHDRAWAL_UPI})", callback_data="withdraw_upi")],
-        [InlineKeyboardButton(f"⚡ Instant Gateway (Min ₹{MIN_WITHDRAWAL_GATEWAY})", callback_data="withdraw_gateway")],
+        [InlineKeyboardButton(f"💳 UPI (Min ₹{CFG.min_upi})", callback_data="withdraw_upi")],
+        [InlineKeyboardButton(f"⚡ Instant Gateway (Min ₹{CFG.min_gw})", callback_data="withdraw_gateway")],
         [InlineKeyboardButton("◀️ Back", callback_data="main_menu")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -635,28 +1150,27 @@ async def withdraw(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=reply_markup,
         parse_mode=ParseMode.MARKDOWN
     )
+    return WITHDRAW_METHOD
 
 async def handle_withdraw_method(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle withdrawal method selection"""
     query = update.callback_query
     await query.answer()
     
-    method = query.data.split('_')[1]
+    method = context.matches[0].group(1)
     context.user_data['withdraw_method'] = method
     
     if method == 'gateway':
-        min_amount = MIN_WITHDRAWAL_GATEWAY
+        min_amount = CFG.min_gw
         method_name = "Instant Gateway"
     else:
-        min_amount = MIN_WITHDRAWAL_UPI
+        min_amount = CFG.min_upi
         method_name = "UPI"
     
     # Get user balance
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (query.from_user.id,))
-    balance = c.fetchone()[0]
-    conn.close()
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_BALANCE, (query.from_user.id,))
+        balance = (await cur.fetchone())[0]
     
     await query.edit_message_text(
         f"💳 *{method_name} Withdrawal*\n\n"
@@ -666,13 +1180,10 @@ async def handle_withdraw_method(update: Update, context: ContextTypes.DEFAULT_T
         f"(Type a number between {min_amount} and {balance:.2f})",
         parse_mode=ParseMode.MARKDOWN
     )
-    context.user_data['awaiting_withdraw_amount'] = True
+    return WITHDRAW_AMOUNT
 
 async def handle_withdraw_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle withdrawal amount input"""
-    if 'awaiting_withdraw_amount' not in context.user_data:
-        return
-    
     user = update.effective_user
     method = context.user_data.get('withdraw_method')
     
@@ -680,112 +1191,82 @@ async def handle_withdraw_amount(update: Update, context: ContextTypes.DEFAULT_T
         amount = float(update.message.text)
     except ValueError:
         await update.message.reply_text("❌ Please enter a valid number")
-        return
+        return WITHDRAW_AMOUNT
     
     # Check minimum based on method
-    min_amount = MIN_WITHDRAWAL_GATEWAY if method == 'gateway' else MIN_WITHDRAWAL_UPI
+    min_amount = CFG.min_gw if method == 'gateway' else CFG.min_upi
     
     if amount < min_amount:
         await update.message.reply_text(f"❌ Minimum withdrawal amount is ₹{min_amount}")
-        return
+        return WITHDRAW_AMOUNT
     
     # Check balance
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-    balance = c.fetchone()[0]
+    async with db() as conn:
+        cur = await conn.execute(SQL_GET_BALANCE, (user.id,))
+        balance = (await cur.fetchone())[0]
     
     if amount > balance:
         await update.message.reply_text(f"❌ Insufficient balance. Your balance: ₹{balance:.2f}")
-        conn.close()
-        return
+        return WITHDRAW_AMOUNT
     
+    context.user_data['withdraw_amount'] = amount
     if method == 'gateway':
         # For gateway, we need account details
         await update.message.reply_text(
             "Please enter your gateway account details (e.g., Phone number/Email):"
         )
-        context.user_data['withdraw_amount'] = amount
-        context.user_data['awaiting_gateway_details'] = True
-        conn.close()
     else:
         # For UPI, we need UPI ID
         await update.message.reply_text(
             "Please enter your UPI ID (e.g., name@okhdfcbank):"
         )
-        context.user_data['withdraw_amount'] = amount
-        context.user_data['awaiting_upi_details'] = True
-        conn.close()
-    
-    del context.user_data['awaiting_withdraw_amount']
+    return WITHDRAW_DETAILS
 
 async def handle_withdraw_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle withdrawal account details"""
-    if 'awaiting_upi_details' not in context.user_data and 'awaiting_gateway_details' not in context.user_data:
-        return
-    
     user = update.effective_user
     amount = context.user_data.get('withdraw_amount')
+    method = 'gateway' if context.user_data.get('withdraw_method') == 'gateway' else 'upi'
+    account_details = update.message.text
     
-    if 'awaiting_upi_details' in context.user_data:
-        method = 'upi'
-        account_details = update.message.text
-        # Simple UPI validation
-        if '@' not in account_details:
-            await update.message.reply_text("❌ Please enter a valid UPI ID (e.g., name@bank)")
-            return
-        del context.user_data['awaiting_upi_details']
-    else:
-        method = 'gateway'
-        account_details = update.message.text
-        del context.user_data['awaiting_gateway_details']
+    # Simple UPI validation
+    if method == 'upi' and '@' not in account_details:
+        await update.message.reply_text("❌ Please enter a valid UPI ID (e.g., name@bank)")
+        return WITHDRAW_DETAILS
     
     # Process withdrawal
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get current balance
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (user.id,))
-    balance_before = c.fetchone()[0]
-    
-    # Create withdrawal request
-    c.execute('''INSERT INTO withdrawals 
-                 (user_id, amount, method, account_details, status, requested_date)
-                 VALUES (?,?,?,?,?,?)''',
-              (user.id, amount, method, account_details, 'pending', 
-               datetime.datetime.now().isoformat()))
-    
-    withdrawal_id = c.lastrowid
-    
-    # Deduct balance immediately (will be refunded if rejected)
-    balance_after = balance_before - amount
-    c.execute("UPDATE users SET balance = ?, total_withdrawn = total_withdrawn + ? WHERE user_id = ?",
-              (balance_after, amount, user.id))
+    async with tx() as conn:
+        # Get current balance
+        cur = await conn.execute(SQL_GET_BALANCE, (user.id,))
+        balance_before = (await cur.fetchone())[0]
+        
+        # Create withdrawal request
+        cur = await conn.execute(SQL_INSERT_WITHDRAWAL, (user.id, amount, method, account_details, 'pending'))
+        
+        withdrawal_id = cur.lastrowid
+        
+        # Deduct balance immediately (will be refunded if rejected)
+        balance_after = balance_before - amount
+        await conn.execute(SQL_DEBIT_WITHDRAWAL, (balance_after, amount, user.id))
     
-    # Log transaction
+    # Log transaction once the balance change is committed
+    invalidate_balance(user.id)
     log_transaction(user.id, 'withdrawal_request', amount, balance_before, balance_after,
-                   f"Withdrawal request #{withdrawal_id} via {method.upper()}")
-    
-    conn.commit()
-    conn.close()
-    
-    # Notify admins
-    for admin_id in ADMIN_IDS:
-        try:
-            admin_text = (
-                f"💰 *New Withdrawal Request*\n\n"
-                f"📋 Request ID: #{withdrawal_id}\n"
-                f"👤 User: {user.first_name} (@{user.username})\n"
-                f"🆔 User ID: {user.id}\n"
-                f"💵 Amount: ₹{amount:.2f}\n"
-                f"💳 Method: {method.upper()}\n"
-                f"📝 Details: {account_details}\n"
-                f"🕐 Requested: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
-                f"Use /approve_withdraw_{withdrawal_id} or /reject_withdraw_{withdrawal_id}"
-            )
-            await context.bot.send_message(chat_id=admin_id, text=admin_text, parse_mode=ParseMode.MARKDOWN)
-        except:
-            pass
+                    f"Withdrawal request #{withdrawal_id} via {method.upper()}")
+    
+    # Notify admins in the background so the user's reply isn't held up
+    admin_text = (
+        f"💰 *New Withdrawal Request*\n\n"
+        f"📋 Request ID: #{withdrawal_id}\n"
+        f"👤 User: {user.first_name} (@{user.username})\n"
+        f"🆔 User ID: {user.id}\n"
+        f"💵 Amount: ₹{amount:.2f}\n"
+        f"💳 Method: {method.upper()}\n"
+        f"📝 Details: {account_details}\n"
+        f"🕐 Requested: {now_iso()[:16].replace('T', ' ')} UTC\n\n"
+        f"Use /approve_withdraw_{withdrawal_id} or /reject_withdraw_{withdrawal_id}"
+    )
+    notify_admins(admin_text)
     
     await update.message.reply_text(
         f"✅ *Withdrawal Request Submitted*\n\n"
@@ -800,63 +1281,61 @@ async def handle_withdraw_details(update: Update, context: ContextTypes.DEFAULT_
     # Clear context
     del context.user_data['withdraw_amount']
     del context.user_data['withdraw_method']
+    return ConversationHandler.END
+
+async def cancel_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Abort an in-progress withdrawal or submission"""
+    for key in ('withdraw_method', 'withdraw_amount', 'pending_submission'):
+        context.user_data.pop(key, None)
+    
+    if update.callback_query:
+        # "◀️ Back" from the withdrawal menu
+        await update.callback_query.answer()
+        await show_main_menu(update, context)
+    elif update.message.text in MENU_BUTTONS:
+        # User moved on to another menu button
+        await handle_message(update, context)
+    else:
+        await update.message.reply_text("❌ Cancelled")
+    return ConversationHandler.END
 
 # Admin Commands
+def admin_only(handler):
+    """Drop updates from anyone not in CFG.admin_ids before the handler runs"""
+    @wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if update.effective_user.id not in CFG.admin_ids:
+            return
+        return await handler(update, context)
+    return wrapper
+
 async def secret_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Secret admin panel access"""
     user = update.effective_user
     
-    if user.id not in ADMIN_IDS:
+    if user.id not in CFG.admin_ids:
         await update.message.reply_text("⛔ Unauthorized access")
         return
     
     # Show admin panel
-    keyboard = [
-        [InlineKeyboardButton("➕ Add Task", callback_data="admin_add_task")],
-        [InlineKeyboardButton("❌ Remove Task", callback_data="admin_remove_task")],
-        [InlineKeyboardButton("📋 All Tasks", callback_data="admin_list_tasks")],
-        [InlineKeyboardButton("👥 All Users", callback_data="admin_list_users")],
-        [InlineKeyboardButton("💳 Pending Withdrawals", callback_data="admin_pending_withdrawals")],
-        [InlineKeyboardButton("📝 Pending Submissions", callback_data="admin_pending_submissions")],
-        [InlineKeyboardButton("💰 Financial Stats", callback_data="admin_financial_stats")],
-        [InlineKeyboardButton("➕ Add Channel", callback_data="admin_add_channel")],
-        [InlineKeyboardButton("❌ Remove Channel", callback_data="admin_remove_channel")],
-        [InlineKeyboardButton("📊 System Stats", callback_data="admin_system_stats")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        "🔐 *Admin Control Panel*\n\n"
-        "Welcome to the secret admin panel.\n"
-        "Select an option below:",
-        reply_markup=reply_markup,
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await update.message.reply_text(ADMIN_PANEL_TEXT, reply_markup=ADMIN_PANEL_MARKUP, parse_mode=ParseMode.MARKDOWN)
 
+@admin_only
 async def admin_add_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start add task process"""
     query = update.callback_query
     await query.answer()
     
     context.user_data['admin_action'] = 'add_task'
-    await query.edit_message_text(
-        "📝 *Add New Task*\n\n"
-        "Please send the task details in this format:\n\n"
-        "Description | Reward | Requirements | Link\n\n"
-        "Example:\n"
-        "Join and post comment | 5 | Must join channel | https://t.me/...\n\n"
-        "Requirements and Link are optional.",
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await query.edit_message_text(ADD_TASK_HELP, parse_mode=ParseMode.MARKDOWN)
 
+@admin_only
 async def admin_handle_task_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle task addition"""
     if context.user_data.get('admin_action') != 'add_task':
         return
     
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
     text = update.message.text
     
@@ -880,579 +1359,428 @@ async def admin_handle_task_add(update: Update, context: ContextTypes.DEFAULT_TY
     task_link = parts[3].strip() if len(parts) > 3 else ""
     
     # Save to database
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''INSERT INTO tasks 
-                 (description, reward, requirements, task_link, created_date, created_by, is_active)
-                 VALUES (?,?,?,?,?,?,?)''',
-              (description, reward, requirements, task_link, 
-               datetime.datetime.now().isoformat(), user.id, 1))
-    
-    task_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    async with tx() as conn:
+        cur = await conn.execute(SQL_INSERT_TASK, (description, reward, requirements, task_link, user.id, 1))
+        
+        task_id = cur.lastrowid
+    invalidate_tasks_cache()
     
-    # Notify all users about new task
-    await notify_users_new_task(context, task_id, description, reward)
+    # Notify all users about new task in the background; the broadcast can take minutes
+    context.application.create_task(notify_users_new_task(context, task_id, description, reward))
     
     await update.message.reply_text(f"✅ Task #{task_id} added successfully!")
     
     # Clear admin action
     del context.user_data['admin_action']
 
+async def mark_blocked(user_ids):
+    """Flag users who blocked the bot so later broadcasts skip them"""
+    if not user_ids:
+        return
+    async with tx() as conn:
+        await conn.executemany(SQL_SET_BOT_BLOCKED, [(1, user_id) for user_id in user_ids])
+
+async def notify_user(bot, user_id, text, **kwargs):
+    """Message one user; flags them blocked on Forbidden and backs off once on RetryAfter
+
+    Never raises, so admin handlers start it with application.create_task and reply without waiting.
+    """
+    try:
+        try:
+            await bot.send_message(chat_id=user_id, text=text, **kwargs)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await bot.send_message(chat_id=user_id, text=text, **kwargs)
+    except Forbidden:
+        await mark_blocked([user_id])
+    except TelegramError as e:
+        # BadRequest (chat not found, markup Telegram couldn't parse) or a timeout; the change is already committed
+        logging.warning(f"Could not notify user {user_id}: {e}")
+
 async def notify_users_new_task(context, task_id, description, reward):
     """Notify all users about new task"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT user_id FROM users WHERE is_verified = 1 AND is_blocked = 0")
-    users = c.fetchall()
-    conn.close()
-    
+    # Plain text: the description is free-form admin input and a stray * or _ would
+    # make Telegram reject the whole message under Markdown
     notification = (
-        f"🆕 *New Task Available!*\n\n"
+        f"🆕 New Task Available!\n\n"
         f"📌 Task #{task_id}\n"
         f"📝 {description}\n"
         f"💰 Reward: ₹{reward:.2f}\n\n"
         f"Check /tasks to view and submit!"
     )
     
-    for (user_id,) in users:
-        try:
-            await context.bot.send_message(chat_id=user_id, text=notification, parse_mode=ParseMode.MARKDOWN)
-        except:
-            pass
+    sem = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    blocked = []
+    send = context.bot.send_message
+    kwargs = {'text': notification}
+    
+    async def _send(user_id):
+        async with sem:
+            try:
+                await send(chat_id=user_id, **kwargs)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                await send(chat_id=user_id, **kwargs)
+            except Forbidden:
+                blocked.append(user_id)
+    
+    # Page through recipients by user_id so a large user base is never loaded at once
+    last_id = 0
+    while True:
+        async with db() as conn:
+            users = await conn.execute_fetchall(SQL_BROADCAST_RECIPIENTS, (last_id, BROADCAST_CHUNK))
+        if not users:
+            break
+        await asyncio.gather(*[_send(user_id) for (user_id,) in users], return_exceptions=True)
+        last_id = users[-1][0]
+    
+    await mark_blocked(blocked)
 
+@admin_only
 async def admin_pending_submissions(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show pending submissions"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''SELECT s.submission_id, s.user_id, s.task_id, s.submitted_date,
-                        u.username, t.description, t.reward
-                 FROM submissions s
-                 JOIN users u ON s.user_id = u.user_id
-                 JOIN tasks t ON s.task_id = t.task_id
-                 WHERE s.status = 'pending'
-                 ORDER BY s.submitted_date''')
-    submissions = c.fetchall()
-    conn.close()
+    async with db() as conn:
+        submissions = await conn.execute_fetchall(SQL_PENDING_SUBMISSIONS)
     
     if not submissions:
         await query.edit_message_text("📭 No pending submissions")
         return
     
-    text = "📝 *Pending Submissions*\n\n"
-    for sub in submissions[:10]:  # Show first 10
-        text += (
-            f"ID: #{sub[0]}\n"
-            f"User: {sub[4] or 'N/A'} (ID: {sub[1]})\n"
-            f"Task #{sub[2]}: {sub[5][:30]}...\n"
-            f"Reward: ₹{sub[6]:.2f}\n"
-            f"Date: {sub[3][:16]}\n"
-            f"Approve: /approve_{sub[0]}\n"
-            f"Reject: /reject_{sub[0]}\n\n"
-        )
+    # HTML with escaped user fields: a _ or * in a username or description breaks Markdown
+    parts = ["📝 <b>Pending Submissions</b>\n\n"]
+    parts.extend(
+        f"ID: #{sub[0]}\n"
+        f"User: {html.escape(sub[4] or 'N/A')} (ID: {sub[1]})\n"
+        f"Task #{sub[2]}: {html.escape(sub[5][:30])}...\n"
+        f"Reward: ₹{sub[6]:.2f}\n"
+        f"Date: {sub[3][:16]}\n"
+        f"Approve: /approve_{sub[0]}\n"
+        f"Reject: /reject_{sub[0]}\n\n"
+        for sub in submissions
+    )
+    text = "".join(parts)
     
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN)
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML)
 
+@admin_only
 async def admin_approve_submission(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Approve a submission"""
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
-    # Parse submission ID
-    if not context.args and not update.message.text.startswith('/approve_'):
+    # Parse submission ID: /approve_123 (regex) or /approve 123
+    if context.matches:
+        submission_id = context.matches[0]['id']
+    elif context.args:
+        submission_id = context.args[0]
+    else:
         await update.message.reply_text("Usage: /approve_SUBMISSION_ID")
         return
+    if not submission_id.isdecimal():
+        await update.message.reply_text("Invalid submission ID")
+        return
+    submission_id = int(submission_id)
     
-    if update.message.text.startswith('/approve_'):
-        try:
-            submission_id = int(update.message.text.split('_')[1])
-        except:
-            await update.message.reply_text("Invalid submission ID")
-            return
-    else:
-        try:
-            submission_id = int(context.args[0])
-        except:
-            await update.message.reply_text("Invalid submission ID")
-            return
-    
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get submission details
-    c.execute('''SELECT s.user_id, s.task_id, t.reward, u.balance
-                 FROM submissions s
-                 JOIN tasks t ON s.task_id = t.task_id
-                 JOIN users u ON s.user_id = u.user_id
-                 WHERE s.submission_id = ? AND s.status = 'pending' ''', 
-              (submission_id,))
-    result = c.fetchone()
+    async with tx() as conn:
+        # Mark the submission approved, getting back who to credit and how much
+        result = await conn.execute_fetchall(SQL_APPROVE_SUBMISSION, (user.id, submission_id))
+        if result:
+            user_id, task_id, reward = result[0]
+            
+            # Credit the reward and move the task from pending to completed
+            new_balance = (await conn.execute_fetchall(SQL_CREDIT_TASK_REWARD, (reward, reward, user_id)))[0][0]
     
     if not result:
         await update.message.reply_text("Submission not found or already processed")
-        conn.close()
         return
     
-    user_id, task_id, reward, current_balance = result
-    
-    # Update submission status
-    c.execute('''UPDATE submissions 
-                 SET status = 'approved', reviewed_date = ?, reviewed_by = ?
-                 WHERE submission_id = ?''',
-              (datetime.datetime.now().isoformat(), user.id, submission_id))
-    
-    # Update user balance and stats
-    new_balance = current_balance + reward
-    c.execute('''UPDATE users 
-                 SET balance = ?, total_earned = total_earned + ?, 
-                     completed_tasks = completed_tasks + 1, pending_tasks = pending_tasks - 1
-                 WHERE user_id = ?''',
-              (new_balance, reward, user_id))
-    
-    # Log transaction
-    log_transaction(user_id, 'credit', reward, current_balance, new_balance,
-                   f"Task #{task_id} approved")
-    
-    conn.commit()
-    conn.close()
+    # Log transaction once the balance change is committed
+    invalidate_balance(user_id)
+    log_transaction(user_id, 'credit', reward, new_balance - reward, new_balance, f"Task #{task_id} approved")
     
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=f"✅ *Task Approved!*\n\n"
-                 f"Your submission for Task #{task_id} has been approved.\n"
-                 f"💰 Reward: ₹{reward:.2f} added to your balance.\n"
-                 f"New Balance: ₹{new_balance:.2f}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, user_id,
+        f"✅ *Task Approved!*\n\n"
+        f"Your submission for Task #{task_id} has been approved.\n"
+        f"💰 Reward: ₹{reward:.2f} added to your balance.\n"
+        f"New Balance: ₹{new_balance:.2f}",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"✅ Submission #{submission_id} approved. ₹{reward:.2f} credited to user.")
 
+@admin_only
 async def admin_reject_submission(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Reject a submission"""
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
-    # Parse submission ID
-    if not context.args and not update.message.text.startswith('/reject_'):
+    # Parse submission ID and reason: /reject_123 reason (regex) or /reject 123 reason
+    if context.matches:
+        m = context.matches[0]
+        submission_id = m['id']
+        reason = m['rest'] or "No reason provided"
+    elif context.args:
+        submission_id = context.args[0]
+        reason = " ".join(context.args[1:]) or "No reason provided"
+    else:
         await update.message.reply_text("Usage: /reject_SUBMISSION_ID [reason]")
         return
+    if not submission_id.isdecimal():
+        await update.message.reply_text("Invalid submission ID")
+        return
+    submission_id = int(submission_id)
     
-    reason = " ".join(context.args[1:]) if context.args and len(context.args) > 1 else "No reason provided"
-    
-    if update.message.text.startswith('/reject_'):
-        try:
-            parts = update.message.text.split('_')
-            submission_id = int(parts[1].split()[0])
-            if len(parts) > 2 or ' ' in update.message.text:
-                reason = update.message.text.split(' ', 1)[1] if ' ' in update.message.text else "No reason provided"
-        except:
-            await update.message.reply_text("Invalid submission ID")
-            return
-    else:
-        try:
-            submission_id = int(context.args[0])
-        except:
-            await update.message.reply_text("Invalid submission ID")
-            return
-    
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get submission details
-    c.execute('''SELECT s.user_id, s.task_id, u.pending_tasks
-                 FROM submissions s
-                 JOIN users u ON s.user_id = u.user_id
-                 WHERE s.submission_id = ? AND s.status = 'pending' ''', 
-              (submission_id,))
-    result = c.fetchone()
+    async with tx() as conn:
+        # Mark the submission rejected, getting back whose it was
+        result = await conn.execute_fetchall(SQL_REJECT_SUBMISSION, (user.id, reason, submission_id))
+        if result:
+            user_id, task_id = result[0]
+            
+            # Update user pending tasks
+            await conn.execute(SQL_DEC_PENDING, (user_id,))
     
     if not result:
         await update.message.reply_text("Submission not found or already processed")
-        conn.close()
         return
     
-    user_id, task_id, pending_tasks = result
-    
-    # Update submission status
-    c.execute('''UPDATE submissions 
-                 SET status = 'rejected', reviewed_date = ?, reviewed_by = ?, notes = ?
-                 WHERE submission_id = ?''',
-              (datetime.datetime.now().isoformat(), user.id, reason, submission_id))
-    
-    # Update user pending tasks
-    c.execute('''UPDATE users 
-                 SET pending_tasks = pending_tasks - 1
-                 WHERE user_id = ?''', (user_id,))
-    
-    conn.commit()
-    conn.close()
-    
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=f"❌ *Task Rejected*\n\n"
-                 f"Your submission for Task #{task_id} has been rejected.\n"
-                 f"Reason: {reason}\n\n"
-                 f"Please review the requirements and submit again.",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, user_id,
+        f"❌ *Task Rejected*\n\n"
+        f"Your submission for Task #{task_id} has been rejected.\n"
+        f"Reason: {reason}\n\n"
+        f"Please review the requirements and submit again.",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"❌ Submission #{submission_id} rejected. User notified.")
 
+@admin_only
 async def admin_pending_withdrawals(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show pending withdrawals"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''SELECT w.withdrawal_id, w.user_id, w.amount, w.method, 
-                        w.account_details, w.requested_date, u.username
-                 FROM withdrawals w
-                 JOIN users u ON w.user_id = u.user_id
-                 WHERE w.status = 'pending'
-                 ORDER BY w.requested_date''')
-    withdrawals = c.fetchall()
-    conn.close()
+    # withdrawals_page_<offset> from the Next/Prev buttons, admin_pending_withdrawals for the first page
+    offset = int(query.data.rsplit('_', 1)[1]) if query.data.startswith('withdrawals_page_') else 0
+    
+    async with db() as conn:
+        # One extra row tells us whether there is a next page
+        withdrawals = await conn.execute_fetchall(SQL_PENDING_WITHDRAWALS, (WITHDRAWALS_PAGE + 1, offset))
     
     if not withdrawals:
         await query.edit_message_text("📭 No pending withdrawals")
         return
     
-    text = "💳 *Pending Withdrawals*\n\n"
-    for w in withdrawals:
-        text += (
-            f"ID: #{w[0]}\n"
-            f"User: {w[6] or 'N/A'} (ID: {w[1]})\n"
-            f"Amount: ₹{w[2]:.2f}\n"
-            f"Method: {w[3].upper()}\n"
-            f"Details: {w[4]}\n"
-            f"Date: {w[5][:16]}\n"
-            f"Approve: /approve_withdraw_{w[0]}\n"
-            f"Reject: /reject_withdraw_{w[0]}\n\n"
-        )
+    has_next = len(withdrawals) > WITHDRAWALS_PAGE
+    parts = ["💳 <b>Pending Withdrawals</b>\n\n"]
+    parts.extend(
+        f"ID: #{w[0]}\n"
+        f"User: {html.escape(w[6] or 'N/A')} (ID: {w[1]})\n"
+        f"Amount: ₹{w[2]:.2f}\n"
+        f"Method: {w[3].upper()}\n"
+        f"Details: {html.escape(w[4])}\n"
+        f"Date: {w[5][:16]}\n"
+        f"Approve: /approve_withdraw_{w[0]}\n"
+        f"Reject: /reject_withdraw_{w[0]}\n\n"
+        for w in withdrawals[:WITHDRAWALS_PAGE]
+    )
+    text = "".join(parts)
     
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN)
+    nav = []
+    if offset:
+        nav.append(InlineKeyboardButton("◀️ Prev", callback_data=f"withdrawals_page_{max(offset - WITHDRAWALS_PAGE, 0)}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Next ▶️", callback_data=f"withdrawals_page_{offset + WITHDRAWALS_PAGE}"))
+    reply_markup = InlineKeyboardMarkup([nav]) if nav else None
+    
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
 
+@admin_only
 async def admin_approve_withdrawal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Approve a withdrawal"""
-    user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
-    
-    # Parse withdrawal ID
-    if not context.args and not update.message.text.startswith('/approve_withdraw_'):
+    # Parse withdrawal ID and txn ID: /approve_withdraw_12 txn (regex) or /approve_withdraw 12 txn
+    if context.matches:
+        m = context.matches[0]
+        withdrawal_id = m['id']
+        txn_id = m['rest'] or "MANUAL"
+    elif context.args:
+        withdrawal_id = context.args[0]
+        txn_id = " ".join(context.args[1:]) or "MANUAL"
+    else:
         await update.message.reply_text("Usage: /approve_withdraw_WITHDRAWAL_ID [txn_id]")
         return
+    if not withdrawal_id.isdecimal():
+        await update.message.reply_text("Invalid withdrawal ID")
+        return
+    withdrawal_id = int(withdrawal_id)
     
-    txn_id = " ".join(context.args[1:]) if context.args and len(context.args) > 1 else "MANUAL"
-    
-    if update.message.text.startswith('/approve_withdraw_'):
-        try:
-            parts = update.message.text.split('_')
-            withdrawal_id = int(parts[2].split()[0])
-            if len(parts) > 3 or ' ' in update.message.text:
-                txn_id = update.message.text.split(' ', 1)[1] if ' ' in update.message.text else "MANUAL"
-        except:
-            await update.message.reply_text("Invalid withdrawal ID")
-            return
-    else:
-        try:
-            withdrawal_id = int(context.args[0])
-        except:
-            await update.message.reply_text("Invalid withdrawal ID")
-            return
-    
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get withdrawal details
-    c.execute('''SELECT user_id, amount, method, account_details
-                 FROM withdrawals
-                 WHERE withdrawal_id = ? AND status = 'pending' ''', 
-              (withdrawal_id,))
-    result = c.fetchone()
+    async with tx() as conn:
+        # Mark the withdrawal completed, getting back its details for the user notice
+        result = await conn.execute_fetchall(SQL_COMPLETE_WITHDRAWAL, (txn_id, withdrawal_id))
     
     if not result:
         await update.message.reply_text("Withdrawal not found or already processed")
-        conn.close()
         return
     
-    user_id, amount, method, account_details = result
-    
-    # Update withdrawal status
-    c.execute('''UPDATE withdrawals 
-                 SET status = 'completed', processed_date = ?, transaction_id = ?
-                 WHERE withdrawal_id = ?''',
-              (datetime.datetime.now().isoformat(), txn_id, withdrawal_id))
-    
-    conn.commit()
-    conn.close()
+    user_id, amount, method = result[0]
     
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=f"✅ *Withdrawal Completed!*\n\n"
-                 f"Your withdrawal of ₹{amount:.2f} via {method.upper()} has been processed.\n"
-                 f"Transaction ID: {txn_id}\n\n"
-                 f"Thank you for using our service!",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, user_id,
+        f"✅ *Withdrawal Completed!*\n\n"
+        f"Your withdrawal of ₹{amount:.2f} via {method.upper()} has been processed.\n"
+        f"Transaction ID: {txn_id}\n\n"
+        f"Thank you for using our service!",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"✅ Withdrawal #{withdrawal_id} approved and marked as completed.")
 
+@admin_only
 async def admin_reject_withdrawal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Reject a withdrawal and refund"""
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
-    # Parse withdrawal ID
-    if not context.args and not update.message.text.startswith('/reject_withdraw_'):
+    # Parse withdrawal ID and reason: /reject_withdraw_12 reason (regex) or /reject_withdraw 12 reason
+    if context.matches:
+        m = context.matches[0]
+        withdrawal_id = m['id']
+        reason = m['rest'] or "No reason provided"
+    elif context.args:
+        withdrawal_id = context.args[0]
+        reason = " ".join(context.args[1:]) or "No reason provided"
+    else:
         await update.message.reply_text("Usage: /reject_withdraw_WITHDRAWAL_ID [reason]")
         return
+    if not withdrawal_id.isdecimal():
+        await update.message.reply_text("Invalid withdrawal ID")
+        return
+    withdrawal_id = int(withdrawal_id)
     
-    reason = " ".join(context.args[1:]) if context.args and len(context.args) > 1 else "No reason provided"
-    
-    if update.message.text.startswith('/reject_withdraw_'):
-        try:
-            parts = update.message.text.split('_')
-            withdrawal_id = int(parts[2].split()[0])
-            if len(parts) > 3 or ' ' in update.message.text:
-                reason = update.message.text.split(' ', 1)[1] if ' ' in update.message.text else "No reason provided"
-        except:
-            await update.message.reply_text("Invalid withdrawal ID")
-            return
-    else:
-        try:
-            withdrawal_id = int(context.args[0])
-        except:
-            await update.message.reply_text("Invalid withdrawal ID")
-            return
-    
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get withdrawal details
-    c.execute('''SELECT user_id, amount, method
-                 FROM withdrawals
-                 WHERE withdrawal_id = ? AND status = 'pending' ''', 
-              (withdrawal_id,))
-    result = c.fetchone()
+    async with tx() as conn:
+        # Mark the withdrawal rejected, getting back who to refund and how much
+        result = await conn.execute_fetchall(SQL_REJECT_WITHDRAWAL, (reason, withdrawal_id))
+        if result:
+            user_id, amount = result[0]
+            
+            # Refund amount
+            new_balance = (await conn.execute_fetchall(SQL_ADD_BALANCE, (amount, user_id)))[0][0]
     
     if not result:
         await update.message.reply_text("Withdrawal not found or already processed")
-        conn.close()
         return
     
-    user_id, amount, method = result
-    
-    # Get current balance
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,))
-    current_balance = c.fetchone()[0]
-    
-    # Refund amount
-    new_balance = current_balance + amount
-    
-    # Update withdrawal status
-    c.execute('''UPDATE withdrawals 
-                 SET status = 'rejected', processed_date = ?, admin_notes = ?
-                 WHERE withdrawal_id = ?''',
-              (datetime.datetime.now().isoformat(), reason, withdrawal_id))
-    
-    # Update user balance
-    c.execute("UPDATE users SET balance = ? WHERE user_id = ?", (new_balance, user_id))
-    
-    # Log transaction
-    log_transaction(user_id, 'refund', amount, current_balance, new_balance,
-                   f"Withdrawal #{withdrawal_id} rejected - {reason}", user.id)
-    
-    conn.commit()
-    conn.close()
+    # Log transaction once the balance change is committed
+    invalidate_balance(user_id)
+    log_transaction(user_id, 'refund', amount, new_balance - amount, new_balance,
+                    f"Withdrawal #{withdrawal_id} rejected - {reason}", user.id)
     
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=f"❌ *Withdrawal Rejected*\n\n"
-                 f"Your withdrawal request for ₹{amount:.2f} has been rejected.\n"
-                 f"Reason: {reason}\n\n"
-                 f"Amount has been refunded to your balance.\n"
-                 f"New Balance: ₹{new_balance:.2f}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, user_id,
+        f"❌ *Withdrawal Rejected*\n\n"
+        f"Your withdrawal request for ₹{amount:.2f} has been rejected.\n"
+        f"Reason: {reason}\n\n"
+        f"Amount has been refunded to your balance.\n"
+        f"New Balance: ₹{new_balance:.2f}",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"❌ Withdrawal #{withdrawal_id} rejected. ₹{amount:.2f} refunded to user.")
 
+ADMIN_ACTIONS = {
+    'approve': admin_approve_submission,
+    'reject': admin_reject_submission,
+    'approve_withdraw': admin_approve_withdrawal,
+    'reject_withdraw': admin_reject_withdrawal,
+}
+
+@admin_only
 async def admin_financial_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show financial statistics"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Total user balance
-    c.execute("SELECT SUM(balance) FROM users")
-    total_user_balance = c.fetchone()[0] or 0
-    
-    # Total paid out
-    c.execute("SELECT SUM(amount) FROM withdrawals WHERE status = 'completed'")
-    total_paid = c.fetchone()[0] or 0
-    
-    # Total pending withdrawals
-    c.execute("SELECT SUM(amount) FROM withdrawals WHERE status = 'pending'")
-    total_pending = c.fetchone()[0] or 0
+    async with db() as conn:
+        # Balances, payouts, rewards and counts in one statement
+        cur = await conn.execute(SQL_FINANCIAL_STATS)
+        (total_user_balance, total_paid, total_pending, total_rewards,
+         total_users, total_tasks) = await cur.fetchone()
     
-    # Total task rewards given
-    c.execute('''SELECT SUM(t.reward) 
-                 FROM submissions s
-                 JOIN tasks t ON s.task_id = t.task_id
-                 WHERE s.status = 'approved' ''')
-    total_rewards = c.fetchone()[0] or 0
-    
-    # Total users
-    c.execute("SELECT COUNT(*) FROM users WHERE is_verified = 1")
-    total_users = c.fetchone()[0]
-    
-    # Total tasks
-    c.execute("SELECT COUNT(*) FROM tasks WHERE is_active = 1")
-    total_tasks = c.fetchone()[0]
-    
-    # Recent transactions
-    c.execute('''SELECT type, SUM(amount) 
-                 FROM transactions 
-                 WHERE date(timestamp) = date('now')
-                 GROUP BY type''')
-    today_txns = c.fetchall()
-    
-    conn.close()
+        # Today's credits and debits, totalled by SQLite
+        cur = await conn.execute(SQL_TODAY_TRANSACTIONS)
+        credit_today, debit_today = await cur.fetchone()
     
     text = (
-        "💰 *Financial Statistics*\n\n"
+        "💰 <b>Financial Statistics</b>\n\n"
         f"👥 Total Verified Users: {total_users}\n"
         f"📋 Active Tasks: {total_tasks}\n\n"
-        f"💵 *Balances*\n"
+        f"💵 <b>Balances</b>\n"
         f"Total User Balance: ₹{total_user_balance:.2f}\n"
         f"Total Paid Out: ₹{total_paid:.2f}\n"
         f"Pending Withdrawals: ₹{total_pending:.2f}\n\n"
-        f"📊 *Task Economy*\n"
+        f"📊 <b>Task Economy</b>\n"
         f"Total Rewards Given: ₹{total_rewards:.2f}\n\n"
-        f"📈 *Today's Activity*\n"
+        f"📈 <b>Today's Activity</b>\n"
     )
     
-    credit_today = sum(amt for type, amt in today_txns if type == 'credit')
-    debit_today = sum(amt for type, amt in today_txns if type in ['debit', 'withdrawal_request'])
-    
     text += f"Credits: ₹{credit_today:.2f}\n"
     text += f"Debits: ₹{debit_today:.2f}\n"
     text += f"Net: ₹{credit_today - debit_today:.2f}\n"
     
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN)
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML)
 
+@admin_only
 async def admin_system_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show system statistics"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    
-    # User stats
-    c.execute("SELECT COUNT(*) FROM users")
-    total_users = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM users WHERE is_verified = 1")
-    verified_users = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM users WHERE is_blocked = 1")
-    blocked_users = c.fetchone()[0]
-    
-    # Task stats
-    c.execute("SELECT COUNT(*) FROM tasks WHERE is_active = 1")
-    active_tasks = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM submissions WHERE status = 'pending'")
-    pending_subs = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM submissions WHERE status = 'approved'")
-    approved_subs = c.fetchone()[0]
-    
-    # Withdrawal stats
-    c.execute("SELECT COUNT(*) FROM withdrawals WHERE status = 'pending'")
-    pending_withdrawals = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM withdrawals WHERE status = 'completed'")
-    completed_withdrawals = c.fetchone()[0]
-    
-    # Channel stats
-    c.execute("SELECT COUNT(*) FROM channels")
-    total_channels = c.fetchone()[0]
-    
-    conn.close()
+    async with db() as conn:
+        # One pass per table, all counts in a single statement
+        cur = await conn.execute(SQL_SYSTEM_STATS)
+        (total_users, verified_users, blocked_users, active_tasks, pending_subs, approved_subs,
+         pending_withdrawals, completed_withdrawals, total_channels) = await cur.fetchone()
     
     text = (
-        "📊 *System Statistics*\n\n"
-        f"👥 *Users*\n"
+        "📊 <b>System Statistics</b>\n\n"
+        f"👥 <b>Users</b>\n"
         f"Total: {total_users}\n"
         f"Verified: {verified_users}\n"
         f"Blocked: {blocked_users}\n\n"
-        f"📋 *Tasks*\n"
+        f"📋 <b>Tasks</b>\n"
         f"Active: {active_tasks}\n"
         f"Pending Submissions: {pending_subs}\n"
         f"Approved Submissions: {approved_subs}\n\n"
-        f"💳 *Withdrawals*\n"
+        f"💳 <b>Withdrawals</b>\n"
         f"Pending: {pending_withdrawals}\n"
         f"Completed: {completed_withdrawals}\n\n"
-        f"📢 *Channels*\n"
+        f"📢 <b>Channels</b>\n"
         f"Total: {total_channels}\n"
     )
     
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN)
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML)
 
+@admin_only
 async def admin_add_channel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Add required channel"""
     query = update.callback_query
     await query.answer()
     
     context.user_data['admin_action'] = 'add_channel'
-    await query.edit_message_text(
-        "📢 *Add Required Channel*\n\n"
-        "Please send the channel details in this format:\n\n"
-        "Channel ID | Channel Name | Type\n\n"
-        "Example:\n"
-        "@mychannel | My Channel | public\n\n"
-        "Channel ID can be @username or channel ID number.\n"
-        "Type: public or private",
-        parse_mode=ParseMode.MARKDOWN
-    )
+    await query.edit_message_text(ADD_CHANNEL_HELP, parse_mode=ParseMode.MARKDOWN)
 
+@admin_only
 async def admin_handle_channel_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle channel addition"""
     if context.user_data.get('admin_action') != 'add_channel':
         return
     
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
     text = update.message.text
     
@@ -1470,29 +1798,20 @@ async def admin_handle_channel_add(update: Update, context: ContextTypes.DEFAULT
     channel_type = parts[2].strip() if len(parts) > 2 else "public"
     
     # Save to database
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''INSERT OR REPLACE INTO channels 
-                 (channel_id, channel_name, channel_type, is_required, added_date, added_by)
-                 VALUES (?,?,?,?,?,?)''',
-              (channel_id, channel_name, channel_type, 1, 
-               datetime.datetime.now().isoformat(), user.id))
-    conn.commit()
-    conn.close()
+    async with tx() as conn:
+        await conn.execute(SQL_UPSERT_CHANNEL, (channel_id, channel_name, channel_type, 1, user.id))
+    invalidate_channels_cache()
     
     await update.message.reply_text(f"✅ Channel {channel_name} added successfully!")
     del context.user_data['admin_action']
 
+@admin_only
 async def admin_remove_channel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Remove required channel"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT channel_id, channel_name FROM channels WHERE is_required = 1")
-    channels = c.fetchall()
-    conn.close()
+    channels = await get_required_channels()
     
     if not channels:
         await query.edit_message_text("📭 No channels configured")
@@ -1510,61 +1829,72 @@ async def admin_remove_channel(update: Update, context: ContextTypes.DEFAULT_TYP
         reply_markup=reply_markup
     )
 
+@admin_only
 async def admin_handle_channel_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle channel removal"""
     query = update.callback_query
     await query.answer()
     
-    channel_id = query.data.split('_')[1]
+    channel_id = query.data.partition('_')[2]  # Usernames like @my_channel contain '_' themselves
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("DELETE FROM channels WHERE channel_id = ?", (channel_id,))
-    conn.commit()
-    conn.close()
+    async with tx() as conn:
+        await conn.execute(SQL_DELETE_CHANNEL, (channel_id,))
+    invalidate_channels_cache()
     
     await query.edit_message_text(f"✅ Channel removed successfully!")
 
+@admin_only
 async def admin_list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """List all users with stats"""
     query = update.callback_query
     await query.answer()
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''SELECT user_id, username, first_name, balance, completed_tasks, 
-                        pending_tasks, is_verified, is_blocked, joined_date
-                 FROM users ORDER BY joined_date DESC LIMIT 20''')
-    users = c.fetchall()
-    conn.close()
+    # users_page_<offset> from the Next/Prev buttons, admin_list_users for the newest users
+    offset = int(query.data.rsplit('_', 1)[1]) if query.data.startswith('users_page_') else 0
+    
+    async with db() as conn:
+        # One extra row tells us whether there is a next page
+        users = await conn.execute_fetchall(SQL_LIST_USERS, (USERS_PAGE + 1, offset))
     
     if not users:
         await query.edit_message_text("📭 No users found")
         return
     
-    text = "👥 *Recent Users (Last 20)*\n\n"
+    has_next = len(users) > USERS_PAGE
+    users = users[:USERS_PAGE]
+    parts = [f"👥 <b>Users {offset + 1}-{offset + len(users)}</b> (newest first)\n\n"]
+    size = len(parts[0])
     for u in users:
         status = "✅" if u[6] else "❌"  # verified
         status += " 🔴" if u[7] else " 🟢"  # blocked
-        text += (
-            f"{status} ID: `{u[0]}`\n"
-            f"Name: {u[2]} (@{u[1] or 'N/A'})\n"
+        entry = (
+            f"{status} ID: <code>{u[0]}</code>\n"
+            f"Name: {html.escape(u[2] or '')} (@{html.escape(u[1] or 'N/A')})\n"
             f"Balance: ₹{u[3]:.2f}\n"
             f"Tasks: {u[4]} completed, {u[5]} pending\n"
-            f"Joined: {u[8][:10]}\n\n"
+            f"Joined: {u[8] or 'N/A'}\n\n"
         )
-    
-    # Split long messages
-    if len(text) > 4000:
-        text = text[:4000] + "...\n(Truncated)"
-    
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN)
+        # Stay under Telegram's 4096-char limit without cutting an entry (or a tag) in half
+        if size + len(entry) > 4000:
+            parts.append("...\n(Truncated)")
+            break
+        parts.append(entry)
+        size += len(entry)
+    text = "".join(parts)
+    
+    nav = []
+    if offset:
+        nav.append(InlineKeyboardButton("◀️ Prev", callback_data=f"users_page_{max(offset - USERS_PAGE, 0)}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Next ▶️", callback_data=f"users_page_{offset + USERS_PAGE}"))
+    reply_markup = InlineKeyboardMarkup([nav]) if nav else None
+    
+    await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
 
+@admin_only
 async def admin_add_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Add points to user (admin command)"""
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
     if len(context.args) < 2:
         await update.message.reply_text("Usage: /addpoints user_id amount [reason]")
@@ -1577,53 +1907,37 @@ async def admin_add_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except:
         await update.message.reply_text("Invalid arguments")
         return
+    if not math.isfinite(amount) or amount <= 0:
+        await update.message.reply_text("Amount must be a positive number")
+        return
     
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get current balance
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (target_id,))
-    result = c.fetchone()
+    result, = await bulk_credit([(target_id, amount, f"Admin add: {reason}")], user.id)
     
-    if not result:
+    if result is None:
         await update.message.reply_text("User not found")
-        conn.close()
+        return
+    if result[0] == result[1]:
+        await update.message.reply_text("❌ Balance unchanged, nothing was added")
         return
     
-    current_balance = result[0]
-    new_balance = current_balance + amount
-    
-    # Update balance
-    c.execute("UPDATE users SET balance = ?, total_earned = total_earned + ? WHERE user_id = ?",
-              (new_balance, amount, target_id))
-    
-    # Log transaction
-    log_transaction(target_id, 'credit', amount, current_balance, new_balance,
-                   f"Admin add: {reason}", user.id)
-    
-    conn.commit()
-    conn.close()
+    new_balance = result[1]
     
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=target_id,
-            text=f"💰 *Balance Updated*\n\n"
-                 f"₹{amount:.2f} has been added to your balance.\n"
-                 f"Reason: {reason}\n"
-                 f"New Balance: ₹{new_balance:.2f}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, target_id,
+        f"💰 *Balance Updated*\n\n"
+        f"₹{amount:.2f} has been added to your balance.\n"
+        f"Reason: {reason}\n"
+        f"New Balance: ₹{new_balance:.2f}",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"✅ Added ₹{amount:.2f} to user {target_id}. New balance: ₹{new_balance:.2f}")
 
+@admin_only
 async def admin_deduct_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Deduct points from user (admin command)"""
     user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
     
     if len(context.args) < 2:
         await update.message.reply_text("Usage: /deductpoints user_id amount [reason]")
@@ -1636,60 +1950,38 @@ async def admin_deduct_points(update: Update, context: ContextTypes.DEFAULT_TYPE
     except:
         await update.message.reply_text("Invalid arguments")
         return
+    if not math.isfinite(amount) or amount <= 0:
+        await update.message.reply_text("Amount must be a positive number")
+        return
     
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Get current balance
-    c.execute("SELECT balance FROM users WHERE user_id = ?", (target_id,))
-    result = c.fetchone()
+    # Deducts only if the balance covers it
+    result, = await bulk_credit([(target_id, -amount, f"Admin deduct: {reason}")], user.id)
     
-    if not result:
+    if result is None:
         await update.message.reply_text("User not found")
-        conn.close()
         return
-    
-    current_balance = result[0]
-    
-    if current_balance < amount:
-        await update.message.reply_text(f"Insufficient balance. User has ₹{current_balance:.2f}")
-        conn.close()
+    if result[0] == result[1]:
+        # bulk_credit skips debits the balance doesn't cover
+        await update.message.reply_text(f"Insufficient balance. User has ₹{result[0]:.2f}")
         return
     
-    new_balance = current_balance - amount
-    
-    # Update balance
-    c.execute("UPDATE users SET balance = ? WHERE user_id = ?",
-              (new_balance, target_id))
-    
-    # Log transaction
-    log_transaction(target_id, 'debit', amount, current_balance, new_balance,
-                   f"Admin deduct: {reason}", user.id)
-    
-    conn.commit()
-    conn.close()
+    new_balance = result[1]
     
     # Notify user
-    try:
-        await context.bot.send_message(
-            chat_id=target_id,
-            text=f"💰 *Balance Updated*\n\n"
-                 f"₹{amount:.2f} has been deducted from your balance.\n"
-                 f"Reason: {reason}\n"
-                 f"New Balance: ₹{new_balance:.2f}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    except:
-        pass
+    context.application.create_task(notify_user(
+        context.bot, target_id,
+        f"💰 *Balance Updated*\n\n"
+        f"₹{amount:.2f} has been deducted from your balance.\n"
+        f"Reason: {reason}\n"
+        f"New Balance: ₹{new_balance:.2f}",
+        parse_mode=ParseMode.MARKDOWN
+    ))
     
     await update.message.reply_text(f"✅ Deducted ₹{amount:.2f} from user {target_id}. New balance: ₹{new_balance:.2f}")
 
+@admin_only
 async def admin_remove_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Remove a task (admin command)"""
-    user = update.effective_user
-    if user.id not in ADMIN_IDS:
-        return
-    
     query = update.callback_query
     if query:
         await query.answer()
@@ -1701,24 +1993,67 @@ async def admin_remove_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     if len(context.args) < 1:
-        await update.message.reply_text("Usage: /removetask task_id")
+        await update.message.reply_text("Usage: /removetask task_id [task_id ...]")
         return
     
     try:
-        task_id = int(context.args[0])
-    except:
+        task_ids = [int(arg) for arg in context.args]
+    except ValueError:
         await update.message.reply_text("Invalid task ID")
         return
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("UPDATE tasks SET is_active = 0 WHERE task_id = ?", (task_id,))
-    if c.rowcount > 0:
-        conn.commit()
-        await update.message.reply_text(f"✅ Task #{task_id} has been removed/deactivated.")
-    else:
-        await update.message.reply_text(f"❌ Task #{task_id} not found.")
-    conn.close()
+    # Any number of ids in one statement and one commit
+    async with tx() as conn:
+        rows = await conn.execute_fetchall(SQL_DEACTIVATE_TASKS, (json.dumps(task_ids),))
+    invalidate_tasks_cache()
+    
+    removed = {row[0] for row in rows}
+    lines = [f"✅ Task #{task_id} has been removed/deactivated." if task_id in removed
+             else f"❌ Task #{task_id} not found." for task_id in dict.fromkeys(task_ids)]
+    await update.message.reply_text("\n".join(lines))
+
+# Plain /commands, looked up by name; keys are lowercase like CommandHandler's
+COMMANDS = {
+    'start': start,
+    'tasks': show_tasks,
+    'profile': show_profile,
+    SECRET_ADMIN_COMMAND[1:].lower(): secret_admin_panel,
+    'addpoints': admin_add_points,
+    'deductpoints': admin_deduct_points,
+    'removetask': admin_remove_task,
+    'approve': admin_approve_submission,
+    'reject': admin_reject_submission,
+    'approve_withdraw': admin_approve_withdrawal,
+    'reject_withdraw': admin_reject_withdrawal,
+}
+
+async def dispatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route every command the conversation didn't claim with one dict lookup instead of a handler per command"""
+    text = update.effective_message.text
+    command, *args = text.split()
+    command, _, mention = command[1:].partition('@')
+    if mention and mention.lower() != context.bot.username.lower():
+        return  # /cmd@other_bot in a group is for someone else
+    handler = COMMANDS.get(command.lower())
+    if handler:
+        context.args = args
+        await handler(update, context)
+        return
+    
+    # Deep-link admin actions: /approve_12, /reject_withdraw_7 reason
+    m = ADMIN_ACTION_CMD_RE.match(text)
+    if m:
+        context.matches = [m]
+        await ADMIN_ACTIONS[m['cmd']](update, context)
+
+# Main menu buttons, looked up by exact text ("💳 Withdraw" belongs to the conversation)
+BUTTON_HANDLERS = {
+    "📋 Available Tasks": show_tasks,
+    "💰 My Balance": show_balance,
+    "📊 My Profile": show_profile,
+    "📜 History": show_history,
+    "📞 Support": show_support,
+}
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle regular messages and button presses"""
@@ -1735,183 +2070,203 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await admin_handle_channel_add(update, context)
         return
     
-    # Handle withdrawal amount input
-    if 'awaiting_withdraw_amount' in context.user_data:
-        await handle_withdraw_amount(update, context)
-        return
-    
-    # Handle withdrawal details input
-    if 'awaiting_upi_details' in context.user_data or 'awaiting_gateway_details' in context.user_data:
-        await handle_withdraw_details(update, context)
-        return
-    
     # Handle main menu buttons
-    if text == "📋 Available Tasks":
-        await show_tasks(update, context)
-    elif text == "💰 My Balance":
-        user = update.effective_user
-        conn = get_db()
-        c = conn.cursor()
-        c.execute("SELECT balance, total_earned, total_withdrawn FROM users WHERE user_id = ?", (user.id,))
-        balance, earned, withdrawn = c.fetchone()
-        conn.close()
-        
-        await update.message.reply_text(
-            f"💰 *Your Balance*\n\n"
-            f"Current Balance: ₹{balance:.2f}\n"
-            f"Total Earned: ₹{earned:.2f}\n"
-            f"Total Withdrawn: ₹{withdrawn:.2f}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    elif text == "📊 My Profile":
-        await show_profile(update, context)
-    elif text == "💳 Withdraw":
-        await withdraw(update, context)
-    elif text == "📞 Support":
-        await update.message.reply_text(
-            f"📞 *Support*\n\n"
-            f"For any issues or questions, contact:\n"
-            f"{SUPPORT_CONTACT}\n\n"
-            f"Response time: 24-48 hours",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    elif text == "📜 History":
-        user = update.effective_user
-        conn = get_db()
-        c = conn.cursor()
-        
-        # Get recent transactions
-        c.execute('''SELECT type, amount, description, timestamp 
-                     FROM transactions 
-                     WHERE user_id = ? 
-                     ORDER BY timestamp DESC LIMIT 10''', (user.id,))
-        transactions = c.fetchall()
-        
-        # Get recent submissions
-        c.execute('''SELECT s.submission_id, s.task_id, t.description, s.status, s.submitted_date
-                     FROM submissions s
-                     JOIN tasks t ON s.task_id = t.task_id
-                     WHERE s.user_id = ?
-                     ORDER BY s.submitted_date DESC LIMIT 5''', (user.id,))
-        submissions = c.fetchall()
-        
-        # Get recent withdrawals
-        c.execute('''SELECT withdrawal_id, amount, method, status, requested_date
-                     FROM withdrawals
-                     WHERE user_id = ?
-                     ORDER BY requested_date DESC LIMIT 5''', (user.id,))
-        withdrawals = c.fetchall()
-        
-        conn.close()
-        
-        history_text = "📜 *Your History*\n\n"
-        
-        history_text += "💸 *Recent Transactions*\n"
-        if transactions:
-            for t in transactions:
-                emoji = "➕" if t[0] == 'credit' else "➖" if t[0] == 'debit' else "💳"
-                history_text += f"{emoji} ₹{t[1]:.2f} - {t[2][:30]} ({t[3][:10]})\n"
-        else:
-            history_text += "No transactions yet\n"
-        
-        history_text += "\n📋 *Recent Submissions*\n"
-        if submissions:
-            for s in submissions:
-                status_emoji = "✅" if s[3] == 'approved' else "❌" if s[3] == 'rejected' else "⏳"
-                history_text += f"{status_emoji} Task #{s[1]}: {s[2][:20]}... ({s[4][:10]})\n"
-        else:
-            history_text += "No submissions yet\n"
-        
-        history_text += "\n💳 *Recent Withdrawals*\n"
-        if withdrawals:
-            for w in withdrawals:
-                status_emoji = "✅" if w[3] == 'completed' else "❌" if w[3] == 'rejected' else "⏳"
-                history_text += f"{status_emoji} ₹{w[1]:.2f} via {w[2]} ({w[4][:10]})\n"
-        else:
-            history_text += "No withdrawals yet\n"
-        
-        await update.message.reply_text(history_text, parse_mode=ParseMode.MARKDOWN)
+    handler = BUTTON_HANDLERS.get(text)
+    if handler:
+        await handler(update, context)
+
+# Callback data with a fixed value
+CALLBACK_HANDLERS = {
+    'verify_channels': handle_verification,
+    'verify_ip': handle_verification,
+    'admin_back': secret_admin_panel,
+    'admin_add_task': admin_add_task,
+    'admin_remove_task': admin_remove_task,
+    # 'admin_list_tasks': to be implemented
+    'admin_list_users': admin_list_users,
+    'admin_pending_withdrawals': admin_pending_withdrawals,
+    'admin_pending_submissions': admin_pending_submissions,
+    'admin_financial_stats': admin_financial_stats,
+    'admin_add_channel': admin_add_channel,
+    'admin_remove_channel': admin_remove_channel,
+    'admin_system_stats': admin_system_stats,
+    'main_menu': show_main_menu,
+}
+
+# Callback data carrying an argument, keyed by the text before the first '_':
+# delchan_<channel_id>, withdrawals_page_<offset>, users_page_<offset>
+CALLBACK_PREFIX_HANDLERS = {
+    'delchan': admin_handle_channel_remove,
+    'withdrawals': admin_pending_withdrawals,
+    'users': admin_list_users,
+}
+
+# Screens that only read: these run detached from their update. Everything else (user_data, writes)
+# is awaited so a user's callbacks keep the per-user ordering PerUserUpdateProcessor gives them
+DETACHABLE_CALLBACKS = {
+    secret_admin_panel, admin_list_users, admin_pending_withdrawals, admin_pending_submissions,
+    admin_financial_stats, admin_remove_channel, admin_system_stats, show_main_menu,
+}
+
+def _callback_handler(data: str):
+    """Pick the handler for a callback query's data, or None if nothing handles it"""
+    return CALLBACK_HANDLERS.get(data) or CALLBACK_PREFIX_HANDLERS.get(data.partition('_')[0])
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle all callback queries"""
     query = update.callback_query
     await query.answer()
     
-    data = query.data
-    
-    # Channel deletion
-    if data.startswith('delchan_'):
-        await admin_handle_channel_remove(update, context)
+    handler = _callback_handler(query.data)
+    if handler is None:
         return
+    if handler in DETACHABLE_CALLBACKS and len(CALLBACK_TASKS) < MAX_CALLBACK_TASKS:
+        # The spinner is already gone; run the screen as its own task so this update's slot frees up now
+        task = context.application.create_task(handler(update, context), update=update)
+        CALLBACK_TASKS.add(task)
+        task.add_done_callback(CALLBACK_TASKS.discard)
+    else:
+        await handler(update, context)
+
+async def post_init(application: Application):
+    """Open the SQLite writer and read pool and the HTTP client and start the background workers"""
+    global POOL, WRITER, HTTP
+    WRITER = await connect_db()
+    POOL = SQLiteConnectionPool(connect_db, pool_size=POOL_SIZE)
+    # Open POOL_MIN connections now by holding them all at once, then hand them back
+    async with AsyncExitStack() as stack:
+        for _ in range(POOL_MIN):
+            await stack.enter_async_context(db())
+    HTTP = httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200)
+    )
+    for _ in range(NOTIFY_WORKERS):
+        WORKER_TASKS.append(asyncio.create_task(_notify_worker(application.bot)))
+    WORKER_TASKS.append(asyncio.create_task(_tx_flusher()))
+
+async def post_shutdown(application: Application):
+    """Flush pending transactions, stop the workers and close the SQLite connections and HTTP client"""
+    if WORKER_TASKS:
+        try:
+            await asyncio.wait_for(TX_Q.join(), TX_SHUTDOWN_TIMEOUT)  # Don't lose queued audit rows
+        except asyncio.TimeoutError:
+            logging.error(f"Transaction rows still unwritten after {TX_SHUTDOWN_TIMEOUT}s")
+    for task in WORKER_TASKS:
+        task.cancel()
+    await asyncio.gather(*WORKER_TASKS, return_exceptions=True)
+    WORKER_TASKS.clear()
+    while not TX_Q.empty():
+        # Last resort: leave them in the log so they can be replayed by hand
+        logging.error(f"Unwritten transaction row: {TX_Q.get_nowait()!r}")
+    if WRITER is not None:
+        # SQLite recommends this before closing: re-ANALYZEs only tables whose stats have gone stale
+        async with write_db() as conn:
+            await conn.execute("PRAGMA optimize")
+        await WRITER.close()
+    if POOL is not None:
+        await POOL.close()
+    if HTTP is not None:
+        await HTTP.aclose()
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process different users' updates concurrently but each user's one at a time, in order.
     
-    # Withdrawal method selection
-    if data.startswith('withdraw_'):
-        await handle_withdraw_method(update, context)
-        return
+    ConversationHandler reads and sets a user's state per update, so two updates from the same
+    user must not overlap: a UPI id sent right after the amount would otherwise be checked
+    against the WITHDRAW_AMOUNT state.
     
-    # Task submission
-    if data.startswith('submit_'):
-        await submit_task(update, context)
-        return
+    process_update holds one of the max_concurrent_updates slots around do_process_update, so
+    updates must not wait in here: the first update for a user runs that user's whole backlog in
+    its slot, and later ones just join the backlog and return. A user flooding the bot therefore
+    occupies one slot, and anything past MAX_PENDING_PER_USER is dropped.
+    """
     
-    # Verification
-    if data in ['verify_channels', 'verify_ip']:
-        await handle_verification(update, context)
-        return
+    MAX_PENDING_PER_USER = 50
     
-    # Admin panel navigation
-    if data == 'admin_back':
-        await secret_admin_panel(update, context)
-        return
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._pending = {}  # user_id -> deque of update coroutines behind the one running
     
-    # Admin actions
-    admin_actions = {
-        'admin_add_task': admin_add_task,
-        'admin_remove_task': admin_remove_task,
-        'admin_list_tasks': None,  # To be implemented
-        'admin_list_users': admin_list_users,
-        'admin_pending_withdrawals': admin_pending_withdrawals,
-        'admin_pending_submissions': admin_pending_submissions,
-        'admin_financial_stats': admin_financial_stats,
-        'admin_add_channel': admin_add_channel,
-        'admin_remove_channel': admin_remove_channel,
-        'admin_system_stats': admin_system_stats
-    }
-    
-    if data in admin_actions and admin_actions[data]:
-        await admin_actions[data](update, context)
-    elif data == 'main_menu':
-        await show_main_menu(update, context)
+    async def do_process_update(self, update, coroutine):
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+        
+        pending = self._pending.get(user.id)
+        if pending is not None:
+            if len(pending) >= self.MAX_PENDING_PER_USER:
+                coroutine.close()
+                logging.warning(f"Dropping update from user {user.id}: {len(pending)} already queued")
+            else:
+                pending.append(coroutine)
+            return
+        
+        pending = self._pending[user.id] = deque()
+        try:
+            while True:
+                try:
+                    await coroutine
+                except Exception:
+                    # Application.process_update reports handler errors itself; keep the backlog moving
+                    logging.exception(f"Update from user {user.id} failed")
+                if not pending:
+                    break
+                coroutine = pending.popleft()
+        finally:
+            del self._pending[user.id]
+            for leftover in pending:  # Only left if we were cancelled mid-backlog
+                leftover.close()
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
 
 def main():
     """Main function to run the bot"""
     # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
-    
-    # User commands
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("tasks", show_tasks))
-    application.add_handler(CommandHandler("profile", show_profile))
-    application.add_handler(CommandHandler("withdraw", withdraw))
-    
-    # Admin commands
-    application.add_handler(CommandHandler(SECRET_ADMIN_COMMAND[1:], secret_admin_panel))  # Remove / for handler
-    application.add_handler(CommandHandler("addpoints", admin_add_points))
-    application.add_handler(CommandHandler("deductpoints", admin_deduct_points))
-    application.add_handler(CommandHandler("removetask", admin_remove_task))
-    
-    # Approval commands
-    application.add_handler(CommandHandler("approve", admin_approve_submission))
-    application.add_handler(CommandHandler("reject", admin_reject_submission))
-    application.add_handler(CommandHandler("approve_withdraw", admin_approve_withdrawal))
-    application.add_handler(CommandHandler("reject_withdraw", admin_reject_withdrawal))
-    
-    # Handle submission with task ID in command
-    application.add_handler(MessageHandler(filters.COMMAND & filters.Regex(r'^/submit_\d+'), submit_task))
-    application.add_handler(MessageHandler(filters.COMMAND & filters.Regex(r'^/approve_\d+'), admin_approve_submission))
-    application.add_handler(MessageHandler(filters.COMMAND & filters.Regex(r'^/reject_\d+'), admin_reject_submission))
-    application.add_handler(MessageHandler(filters.COMMAND & filters.Regex(r'^/approve_withdraw_\d+'), admin_approve_withdrawal))
-    application.add_handler(MessageHandler(filters.COMMAND & filters.Regex(r'^/reject_withdraw_\d+'), admin_reject_withdrawal))
+    application = (
+        Application.builder()
+        .token(CFG.bot_token)
+        .concurrent_updates(PerUserUpdateProcessor(256))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    
+    # Needs the job-queue extra (PTB warns if it's missing); without it balances just load lazily and the caches go unpruned
+    if application.job_queue:
+        application.job_queue.run_repeating(refresh_caches, interval=BALANCE_REFRESH_INTERVAL)
+    
+    # Multi-step withdrawal and task submission flows
+    text_input = filters.TEXT & ~filters.COMMAND & ~filters.Text(MENU_BUTTONS)
+    application.add_handler(ConversationHandler(
+        entry_points=[
+            CommandHandler("withdraw", withdraw),
+            MessageHandler(filters.Text(["💳 Withdraw"]), withdraw),
+            CallbackQueryHandler(handle_withdraw_method, pattern=r'^withdraw_(upi|gateway)$'),
+            MessageHandler(filters.COMMAND & filters.Regex(SUBMIT_CMD_RE), submit_task),
+            CallbackQueryHandler(submit_task, pattern=r'^submit_(\d+)$'),
+        ],
+        states={
+            WITHDRAW_METHOD: [CallbackQueryHandler(handle_withdraw_method, pattern=r'^withdraw_(upi|gateway)$')],
+            WITHDRAW_AMOUNT: [MessageHandler(text_input, handle_withdraw_amount)],
+            WITHDRAW_DETAILS: [MessageHandler(text_input, handle_withdraw_details)],
+            SUBMIT_PHOTO: [MessageHandler(filters.PHOTO, handle_screenshot)],
+        },
+        fallbacks=[
+            CommandHandler("cancel", cancel_conversation),
+            CallbackQueryHandler(cancel_conversation, pattern=r'^main_menu$'),
+            MessageHandler(filters.Text(MENU_BUTTONS), cancel_conversation),
+        ],
+        allow_reentry=True
+    ))
+    
+    # User and admin commands, including /approve_12-style deep links (see COMMANDS)
+    application.add_handler(MessageHandler(filters.COMMAND, dispatch_command))
     
     # Handle photos (screenshots)
     application.add_handler(MessageHandler(filters.PHOTO, handle_screenshot))
@@ -1924,7 +2279,18 @@ def main():
     
     # Start bot
     print("Bot is running...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if CFG.webhook_url:
+        # Telegram pushes updates to us; TLS is terminated by the hosting proxy
+        application.run_webhook(
+            listen='0.0.0.0',
+            port=CFG.webhook_port,
+            url_path=CFG.bot_token,
+            webhook_url=f"{CFG.webhook_url.rstrip('/')}/{CFG.bot_token}",
+            max_connections=100,
+            allowed_updates=Update.ALL_TYPES
+        )
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file